@@ -0,0 +1,36 @@
+"""unique tracker per user and date
+
+Revision ID: 2b7e9f3a5c12
+Revises: 8c1d2e4f6a01
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7e9f3a5c12'
+down_revision: Union[str, None] = '8c1d2e4f6a01'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the newest row if concurrent POST /trackers ever slipped in a duplicate
+    op.execute(
+        """
+        DELETE FROM trackers t
+        USING trackers newer
+        WHERE t.user_id = newer.user_id
+          AND t.date = newer.date
+          AND t.id < newer.id
+        """
+    )
+    op.create_unique_constraint('uq_trackers_user_date', 'trackers', ['user_id', 'date'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_trackers_user_date', 'trackers', type_='unique')
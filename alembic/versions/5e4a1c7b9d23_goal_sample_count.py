@@ -0,0 +1,26 @@
+"""goal sample count
+
+Revision ID: 5e4a1c7b9d23
+Revises: 2b7e9f3a5c12
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e4a1c7b9d23'
+down_revision: Union[str, None] = '2b7e9f3a5c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('goals', sa.Column('sample_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('goals', 'sample_count')
@@ -0,0 +1,42 @@
+"""user metric stats
+
+Revision ID: 9a3f6d2e1b48
+Revises: 5e4a1c7b9d23
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3f6d2e1b48'
+down_revision: Union[str, None] = '5e4a1c7b9d23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_metric_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('metric', sa.String(), nullable=False),
+        sa.Column('mean', sa.Float(), nullable=False),
+        sa.Column('variance', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('last_value', sa.Float(), nullable=True),
+        sa.Column('last_date', sa.Date(), nullable=True),
+        sa.Column('prev_mean', sa.Float(), nullable=True),
+        sa.Column('prev_variance', sa.Float(), nullable=True),
+        sa.Column('prev_count', sa.Integer(), nullable=True),
+        sa.Column('prev_date', sa.Date(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'metric'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_metric_stats')
@@ -0,0 +1,44 @@
+"""user directory indexes
+
+Revision ID: a1d5c3e7f920
+Revises: f3a6b8d0c257
+Create Date: 2026-10-19 15:00:00.000000
+
+Indexes behind the paginated admin user directory. Built CONCURRENTLY so the
+users table stays writable while they build.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1d5c3e7f920'
+down_revision: Union[str, None] = 'f3a6b8d0c257'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_users_role_id", "btree (role, id)"),
+    ("ix_users_activity_level_id", "btree (activity_level, id)"),
+    ("ix_users_created_at", "btree (created_at)"),
+    ("ix_users_name_prefix", "btree (lower(name) varchar_pattern_ops)"),
+    ("ix_users_email_prefix", "btree (lower(email) varchar_pattern_ops)"),
+    ("ix_users_name_trgm", "gin (lower(name) gin_trgm_ops)"),
+    ("ix_users_email_trgm", "gin (lower(email) gin_trgm_ops)"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, definition in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON users USING {definition}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
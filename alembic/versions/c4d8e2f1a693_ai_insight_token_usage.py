@@ -0,0 +1,28 @@
+"""ai insight token usage
+
+Revision ID: c4d8e2f1a693
+Revises: 9a3f6d2e1b48
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e2f1a693'
+down_revision: Union[str, None] = '9a3f6d2e1b48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ai_insights', sa.Column('prompt_tokens', sa.Integer(), nullable=True))
+    op.add_column('ai_insights', sa.Column('completion_tokens', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ai_insights', 'completion_tokens')
+    op.drop_column('ai_insights', 'prompt_tokens')
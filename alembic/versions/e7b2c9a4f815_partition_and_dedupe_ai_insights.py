@@ -0,0 +1,128 @@
+"""partition and dedupe ai insights
+
+Revision ID: e7b2c9a4f815
+Revises: c4d8e2f1a693
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2c9a4f815'
+down_revision: Union[str, None] = 'c4d8e2f1a693'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONTENT_HASH = "encode(sha256(convert_to(insight_text, 'UTF8')), 'hex')"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ai_insight_contents',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('content_hash'),
+    )
+
+    # Keep the old table (and its id sequence) aside while the partitioned one is built
+    op.execute("ALTER TABLE ai_insights RENAME TO ai_insights_legacy")
+    op.execute("ALTER TABLE ai_insights_legacy RENAME CONSTRAINT ai_insights_pkey TO ai_insights_legacy_pkey")
+    op.execute("ALTER INDEX ix_ai_insights_id RENAME TO ix_ai_insights_legacy_id")
+    op.execute("ALTER TABLE ai_insights_legacy ALTER COLUMN id DROP DEFAULT")
+    op.execute("ALTER SEQUENCE ai_insights_id_seq OWNED BY NONE")
+
+    op.execute(
+        """
+        CREATE TABLE ai_insights (
+            id INTEGER NOT NULL DEFAULT nextval('ai_insights_id_seq'),
+            generated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            content_hash VARCHAR(64) NOT NULL REFERENCES ai_insight_contents (content_hash),
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            CONSTRAINT ai_insights_pkey PRIMARY KEY (id, generated_at)
+        ) PARTITION BY RANGE (generated_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE ai_insights_id_seq OWNED BY ai_insights.id")
+    op.create_index('ix_ai_insights_user_generated', 'ai_insights', ['user_id', 'generated_at'])
+    op.create_index(op.f('ix_ai_insights_content_hash'), 'ai_insights', ['content_hash'])
+
+    # One partition per month from the oldest insight to three months ahead
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month date;
+            last_month date;
+        BEGIN
+            SELECT date_trunc('month', COALESCE(MIN(generated_at), now()))::date
+            INTO month FROM ai_insights_legacy;
+            last_month := (date_trunc('month', now()) + interval '3 months')::date;
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF ai_insights FOR VALUES FROM (%L) TO (%L)',
+                    'ai_insights_p' || to_char(month, 'YYYYMM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$;
+        """
+    )
+    op.execute("CREATE TABLE ai_insights_default PARTITION OF ai_insights DEFAULT")
+
+    op.execute(
+        f"""
+        INSERT INTO ai_insight_contents (content_hash, text, created_at)
+        SELECT {CONTENT_HASH}, insight_text, MIN(generated_at)
+        FROM ai_insights_legacy
+        GROUP BY insight_text
+        ON CONFLICT (content_hash) DO NOTHING
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO ai_insights (id, generated_at, user_id, content_hash, prompt_tokens, completion_tokens)
+        SELECT id, COALESCE(generated_at, now()), user_id, {CONTENT_HASH}, prompt_tokens, completion_tokens
+        FROM ai_insights_legacy
+        """
+    )
+    op.execute("DROP TABLE ai_insights_legacy")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE ai_insights ALTER COLUMN id DROP DEFAULT")
+    op.execute("ALTER SEQUENCE ai_insights_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE ai_insights RENAME TO ai_insights_partitioned")
+    op.execute("ALTER TABLE ai_insights_partitioned RENAME CONSTRAINT ai_insights_pkey TO ai_insights_partitioned_pkey")
+
+    op.create_table(
+        'ai_insights',
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('ai_insights_id_seq')"), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('insight_text', sa.Text(), nullable=False),
+        sa.Column('generated_at', sa.DateTime(), nullable=True),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+        sa.Column('completion_tokens', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute("ALTER SEQUENCE ai_insights_id_seq OWNED BY ai_insights.id")
+    op.execute(
+        """
+        INSERT INTO ai_insights (id, user_id, insight_text, generated_at, prompt_tokens, completion_tokens)
+        SELECT i.id, i.user_id, c.text, i.generated_at, i.prompt_tokens, i.completion_tokens
+        FROM ai_insights_partitioned i
+        JOIN ai_insight_contents c ON c.content_hash = i.content_hash
+        """
+    )
+    op.execute("DROP TABLE ai_insights_partitioned CASCADE")
+    op.drop_table('ai_insight_contents')
+    op.create_index(op.f('ix_ai_insights_id'), 'ai_insights', ['id'], unique=False)
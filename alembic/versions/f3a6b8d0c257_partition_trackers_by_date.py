@@ -0,0 +1,166 @@
+"""partition trackers by date
+
+Revision ID: f3a6b8d0c257
+Revises: e7b2c9a4f815
+Create Date: 2026-10-19 14:00:00.000000
+
+Builds a monthly range-partitioned copy of trackers while the old table stays
+live: a trigger mirrors concurrent writes, existing rows are copied in small
+committed batches, and the tables are swapped under a short exclusive lock.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import PARTITION_MONTHS_BACK
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a6b8d0c257'
+down_revision: Union[str, None] = 'e7b2c9a4f815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COPY_BATCH_SIZE = 50000
+COLUMNS = "id, user_id, date, steps, calories, sleep_hours, mood_score, stress_level, created_at"
+NEW_COLUMNS = (
+    "NEW.id, NEW.user_id, NEW.date, NEW.steps, NEW.calories, NEW.sleep_hours, "
+    "NEW.mood_score, NEW.stress_level, NEW.created_at"
+)
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE trackers_partitioned (
+            id INTEGER NOT NULL DEFAULT nextval('trackers_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            date DATE NOT NULL,
+            steps INTEGER,
+            calories INTEGER,
+            sleep_hours DOUBLE PRECISION,
+            mood_score INTEGER,
+            stress_level INTEGER,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT trackers_partitioned_pkey PRIMARY KEY (id, date),
+            CONSTRAINT uq_trackers_partitioned_user_date UNIQUE (user_id, date)
+        ) PARTITION BY RANGE (date)
+        """
+    )
+    op.execute("CREATE INDEX ix_trackers_partitioned_id ON trackers_partitioned (id)")
+
+    # One partition per month from the oldest entry (but at most
+    # PARTITION_MONTHS_BACK back, so a stray 1900 date doesn't create a
+    # thousand partitions) to three months ahead; older rows go to the default
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month date;
+            last_month date;
+        BEGIN
+            SELECT GREATEST(
+                date_trunc('month', COALESCE(MIN(date), now())),
+                date_trunc('month', now()) - interval '{PARTITION_MONTHS_BACK} months'
+            )::date
+            INTO month FROM trackers;
+            last_month := (date_trunc('month', now()) + interval '3 months')::date;
+            WHILE month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF trackers_partitioned FOR VALUES FROM (%L) TO (%L)',
+                    'trackers_p' || to_char(month, 'YYYYMM'),
+                    month,
+                    (month + interval '1 month')::date
+                );
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$;
+        """
+    )
+    op.execute("CREATE TABLE trackers_default PARTITION OF trackers_partitioned DEFAULT")
+
+    # Mirror writes made to the live table while the copy runs
+    op.execute(
+        f"""
+        CREATE FUNCTION trackers_mirror_to_partitioned() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM trackers_partitioned WHERE id = OLD.id AND date = OLD.date;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO trackers_partitioned ({COLUMNS})
+                VALUES ({NEW_COLUMNS})
+                ON CONFLICT DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER trackers_mirror_to_partitioned
+        AFTER INSERT OR UPDATE OR DELETE ON trackers
+        FOR EACH ROW EXECUTE FUNCTION trackers_mirror_to_partitioned()
+        """
+    )
+
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        max_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM trackers")).scalar()
+        # FOR SHARE makes concurrent updates/deletes of a batch wait for its commit,
+        # so the mirror trigger always runs after the row was copied.
+        for start in range(0, max_id, COPY_BATCH_SIZE):
+            bind.execute(sa.text(
+                f"""
+                INSERT INTO trackers_partitioned ({COLUMNS})
+                SELECT {COLUMNS} FROM trackers
+                WHERE id > :start AND id <= :end
+                FOR SHARE
+                ON CONFLICT DO NOTHING
+                """
+            ), {"start": start, "end": start + COPY_BATCH_SIZE})
+
+    op.execute("LOCK TABLE trackers IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER trackers_mirror_to_partitioned ON trackers")
+    op.execute("DROP FUNCTION trackers_mirror_to_partitioned()")
+    op.execute("ALTER TABLE trackers ALTER COLUMN id DROP DEFAULT")
+    op.execute("ALTER SEQUENCE trackers_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE trackers")
+
+    op.execute("ALTER TABLE trackers_partitioned RENAME TO trackers")
+    op.execute("ALTER TABLE trackers RENAME CONSTRAINT trackers_partitioned_pkey TO trackers_pkey")
+    op.execute("ALTER TABLE trackers RENAME CONSTRAINT uq_trackers_partitioned_user_date TO uq_trackers_user_date")
+    op.execute("ALTER INDEX ix_trackers_partitioned_id RENAME TO ix_trackers_id")
+    op.execute("ALTER SEQUENCE trackers_id_seq OWNED BY trackers.id")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE trackers ALTER COLUMN id DROP DEFAULT")
+    op.execute("ALTER SEQUENCE trackers_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE trackers RENAME TO trackers_partitioned")
+    op.execute("ALTER TABLE trackers_partitioned RENAME CONSTRAINT trackers_pkey TO trackers_partitioned_pkey")
+    op.execute("ALTER TABLE trackers_partitioned RENAME CONSTRAINT uq_trackers_user_date TO uq_trackers_partitioned_user_date")
+    op.execute("ALTER INDEX ix_trackers_id RENAME TO ix_trackers_partitioned_id")
+
+    op.create_table(
+        'trackers',
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('trackers_id_seq')"), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('steps', sa.Integer(), nullable=True),
+        sa.Column('calories', sa.Integer(), nullable=True),
+        sa.Column('sleep_hours', sa.Float(), nullable=True),
+        sa.Column('mood_score', sa.Integer(), nullable=True),
+        sa.Column('stress_level', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'date', name='uq_trackers_user_date'),
+    )
+    op.execute("ALTER SEQUENCE trackers_id_seq OWNED BY trackers.id")
+    op.execute(f"INSERT INTO trackers ({COLUMNS}) SELECT {COLUMNS} FROM trackers_partitioned")
+    op.execute("DROP TABLE trackers_partitioned CASCADE")
+    op.create_index(op.f('ix_trackers_id'), 'trackers', ['id'], unique=False)
@@ -0,0 +1,186 @@
+from app.config import REDIS_URL, CACHE_STALE_SECONDS, CACHE_LOCK_SECONDS, CACHE_COLD_WAIT_SECONDS, CACHE_XFETCH_BETA
+from app import profiling, serialization
+import redis
+import math
+import random
+import time
+import uuid
+
+try:
+    redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+except Exception:
+    redis_client = None
+
+# Per-user data versions, bumped after every committed write to that user's rows.
+# "version" covers everything; one extra field per table scopes it to that table.
+DATA_VERSION_TTL = 30 * 24 * 3600
+
+def _data_version_key(user_id: int) -> str:
+    return f"data_version:{user_id}"
+
+def bump_data_versions(writes):
+    # writes: {user_id: {table names}}
+    if not redis_client:
+        return
+
+    now = time.time()
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for user_id, tables in writes.items():
+            key = _data_version_key(user_id)
+            for field in ["version", *tables]:
+                # Seed from the clock so a lost key never reissues an old version
+                pipe.hsetnx(key, field, int(now * 1000))
+                pipe.hincrby(key, field, 1)
+            pipe.hset(key, "modified", now)
+            pipe.expire(key, DATA_VERSION_TTL)
+        with profiling.section("redis"):
+            pipe.execute()
+    except Exception:
+        pass
+
+def get_data_version(user_id: int, scope: str = "version"):
+    # Returns (version, modified_at epoch seconds), or None when Redis is unavailable
+    if not redis_client:
+        return None
+
+    now = time.time()
+    key = _data_version_key(user_id)
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hsetnx(key, scope, int(now * 1000))
+        pipe.hsetnx(key, "modified", now)
+        pipe.expire(key, DATA_VERSION_TTL)
+        pipe.hmget(key, scope, "modified")
+        with profiling.section("redis"):
+            version, modified = pipe.execute()[-1]
+        return int(version), float(modified)
+    except Exception:
+        return None
+
+
+# Stampede-protected cache. Entries are stored as "<logical expiry> <seconds the
+# last compute took>\n<serialized body>" and kept in Redis for an extra stale
+# window past the expiry. Readers refresh early with probability growing as the
+# expiry nears (XFetch), only the holder of the recompute lock rebuilds, and
+# everyone else is served the stale body meanwhile. Bodies are stored as
+# serialized, so callers that can send them verbatim never decode them.
+CACHE_LOCK_POLL_SECONDS = 0.05
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_MISSING = object()
+
+def _lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+def _decode_entry(raw):
+    # Returns (expiry, delta, body) or None
+    if not raw:
+        return None
+    header, separator, body = raw.partition("\n")
+    if not separator:
+        return None
+    try:
+        expiry, delta = (float(part) for part in header.split(" "))
+    except ValueError:
+        return None
+    return expiry, delta, body
+
+def _should_refresh(entry, now: float) -> bool:
+    # XFetch: -delta * beta * ln(U) is an exponential head start proportional
+    # to how long the value takes to rebuild
+    expiry, delta, _ = entry
+    head_start = -delta * CACHE_XFETCH_BETA * math.log(random.random() or 1e-12)
+    return now + head_start >= expiry
+
+def _compute_and_store(key: str, ttl: int, compute):
+    started = time.perf_counter()
+    body = compute()
+    delta = time.perf_counter() - started
+    try:
+        with profiling.section("redis"):
+            redis_client.setex(key, ttl + CACHE_STALE_SECONDS, f"{time.time() + ttl:.3f} {delta:.4f}\n{body}")
+    except Exception:
+        pass
+    return body
+
+def get_or_compute_raw(key: str, ttl: int, compute, prefetched=_MISSING):
+    # compute returns the serialized body (str). Returns (body, served_from_cache).
+    # `prefetched` lets callers that already fetched the raw entry (e.g. with
+    # MGET) skip the GET.
+    if not redis_client:
+        return compute(), False
+
+    try:
+        with profiling.section("redis"):
+            raw = redis_client.get(key) if prefetched is _MISSING else prefetched
+    except Exception:
+        return compute(), False
+
+    entry = _decode_entry(raw)
+    now = time.time()
+    if entry and not _should_refresh(entry, now):
+        return entry[2], True
+
+    token = uuid.uuid4().hex
+    try:
+        with profiling.section("redis"):
+            locked = redis_client.set(_lock_key(key), token, nx=True, ex=CACHE_LOCK_SECONDS)
+    except Exception:
+        locked = True
+        token = None
+
+    if locked:
+        try:
+            return _compute_and_store(key, ttl, compute), False
+        finally:
+            if token:
+                try:
+                    with profiling.section("redis"):
+                        redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, _lock_key(key), token)
+                except Exception:
+                    pass
+
+    # Someone else is rebuilding: serve what we have, even if stale
+    if entry:
+        return entry[2], True
+
+    # Cold key: wait about as long as a compute takes for the rebuild rather
+    # than piling onto the database; past that, compute it ourselves
+    deadline = time.time() + CACHE_COLD_WAIT_SECONDS
+    while time.time() < deadline:
+        time.sleep(CACHE_LOCK_POLL_SECONDS)
+        try:
+            with profiling.section("redis"):
+                entry = _decode_entry(redis_client.get(key))
+                lock_held = entry is None and redis_client.exists(_lock_key(key))
+            if entry:
+                return entry[2], True
+            if not lock_held:
+                break
+        except Exception:
+            break
+
+    return _compute_and_store(key, ttl, compute), False
+
+def get_or_compute(key: str, ttl: int, compute, prefetched=_MISSING):
+    # Same as get_or_compute_raw for callers that want the decoded value
+    if not redis_client:
+        return compute(), False
+
+    computed = []
+
+    def compute_body():
+        computed.append(compute())
+        return serialization.dumps(computed[0]).decode("utf-8")
+
+    body, cached = get_or_compute_raw(key, ttl, compute_body, prefetched)
+    if computed:
+        return computed[0], cached
+    return serialization.loads(body), cached
@@ -0,0 +1,305 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from typing import List
+from app.database import SessionLocal, engine
+from app.config import PARTITION_MONTHS_AHEAD, PARTITION_MONTHS_BACK, INSIGHT_RETENTION_MONTHS, INSIGHT_ARCHIVE_DIR
+from app import goal_engine, insight_store, models, partitions, rolling_stats, schemas, serialization, sketches, trends, user_directory
+
+
+def recompute_goals(args):
+    db = SessionLocal()
+    try:
+        updated = goal_engine.recompute_goals(db, user_id=args.user_id)
+    finally:
+        db.close()
+    print(f"Recomputed {updated} goals")
+
+
+def rebuild_sketches(args):
+    db = SessionLocal()
+    try:
+        recorded = sketches.rebuild(db)
+    finally:
+        db.close()
+    print(f"Rebuilt cohort sketches from {recorded} tracker entries")
+
+
+def backfill_rolling_stats(args):
+    db = SessionLocal()
+    try:
+        users = rolling_stats.rebuild(db, user_id=args.user_id)
+    finally:
+        db.close()
+    print(f"Backfilled rolling statistics for {users} users")
+
+
+PARTITIONED_TABLES = [("trackers", "date"), ("ai_insights", "generated_at")]
+
+
+def ensure_partitions(args):
+    since = datetime.strptime(args.since, "%Y-%m").date() if args.since else None
+    with engine.begin() as conn:
+        for table, column in PARTITIONED_TABLES:
+            created = partitions.ensure_month_partitions(
+                conn, table, column, args.months_ahead, since, months_back=args.months_back
+            )
+            print(f"Created {created} {table} partitions")
+
+
+def check_partition_pruning(args):
+    start = date.today() - timedelta(days=args.days)
+    first_month = partitions.month_start(start)
+
+    with engine.connect() as conn:
+        scanned = partitions.scanned_relations(
+            conn,
+            "SELECT * FROM trackers WHERE user_id = :user_id AND date >= :start ORDER BY date",
+            {"user_id": args.user_id, "start": start}
+        )
+        stale = [
+            name for name, month in partitions.list_partitions(conn, "trackers")
+            if month < first_month and name in scanned
+        ]
+
+    print(f"Partitions scanned for the last {args.days} days: {', '.join(sorted(scanned))}")
+    if "trackers" in scanned or stale:
+        print(f"Partition pruning failed; unexpected scans: {', '.join(stale) or 'trackers (not partitioned)'}")
+        sys.exit(1)
+    print("Partition pruning OK")
+
+
+def archive_insights(args):
+    archived = insight_store.archive_old_insights(engine, args.retention_months, args.archive_dir)
+    for path in archived:
+        print(f"Archived {path}")
+    print(f"Archived {len(archived)} ai_insights partitions")
+
+
+SEED_BENCHMARK_USERS_SQL = """
+    INSERT INTO users (name, email, password_hash, age, activity_level, role, created_at)
+    SELECT
+        'Bench User ' || g,
+        'bench' || g || '@example.invalid',
+        '!',
+        18 + g % 60,
+        (ARRAY['sedentary', 'light', 'moderate', 'active', 'very active'])[1 + g % 5],
+        (CASE WHEN g % 1000 = 0 THEN 'ADMIN' ELSE 'USER' END)::userrole,
+        now() - (g % 1500) * interval '1 day'
+    FROM generate_series(1, :users) AS g
+"""
+
+
+def _sequential_scans(db: Session, query) -> bool:
+    compiled = query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") == "users":
+            return True
+        nodes.extend(node.get("Plans", []))
+    return False
+
+
+def benchmark_user_directory(args):
+    # Seeds synthetic users inside a transaction that is always rolled back
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        db = Session(bind=conn)
+        try:
+            if args.users:
+                started = time.perf_counter()
+                conn.execute(text(SEED_BENCHMARK_USERS_SQL), {"users": args.users})
+                conn.execute(text("ANALYZE users"))
+                print(f"Seeded {args.users} users in {time.perf_counter() - started:.1f}s")
+
+            last_id = conn.execute(text("SELECT max(id) FROM users")).scalar() or 0
+            cases = [
+                ("first page", {}),
+                ("deep page", {"cursor": user_directory.encode_cursor(max(last_id - args.limit * 2, 0))}),
+                ("role=admin", {"role": models.UserRole.ADMIN}),
+                ("activity_level", {"activity_level": "moderate"}),
+                ("signed up last 30 days", {"signed_up_from": date.today() - timedelta(days=30)}),
+                ("prefix search", {"q": "be"}),
+                ("trigram search", {"q": "bench4242@"}),
+            ]
+
+            for label, params in cases:
+                cursor = params.pop("cursor", None)
+                timings = []
+                for _ in range(args.runs):
+                    started = time.perf_counter()
+                    users, _ = user_directory.directory_page(db, args.limit, cursor, **params)
+                    timings.append((time.perf_counter() - started) * 1000)
+                after_id = user_directory.decode_cursor(cursor) if cursor else 0
+                plan = "SEQ SCAN" if _sequential_scans(
+                    db, user_directory.directory_query(db, after_id=after_id, **params).limit(args.limit + 1)
+                ) else "index"
+                print(f"{label:<24} {statistics.median(timings):8.2f} ms  {len(users):>4} rows  {plan}")
+        finally:
+            db.close()
+            transaction.rollback()
+
+
+def _median_ms(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def benchmark_serialization(args):
+    # In-memory only: transient tracker rows and a progress payload of the same size
+    today = date.today()
+    rows = [
+        models.Tracker(
+            id=i, user_id=1, date=today - timedelta(days=i), steps=8000 + i % 4000, calories=2100,
+            sleep_hours=7.25, mood_score=1 + i % 10, stress_level=1 + i % 10, created_at=datetime.utcnow()
+        )
+        for i in range(args.rows)
+    ]
+    adapter = TypeAdapter(List[schemas.TrackerResponse])
+    progress = {
+        "daily_data": [
+            {"date": str(row.date), "sleep_hours": row.sleep_hours, "steps": row.steps, "calories": row.calories,
+             "mood_score": row.mood_score, "stress_level": row.stress_level}
+            for row in rows
+        ],
+        "averages": {"sleep_hours": 7.25, "steps": 10000, "calories": 2100, "mood_score": 5.5, "stress_level": 5.5},
+        "trends": {}
+    }
+    cached_body = json.dumps(progress)
+
+    cases = [
+        (
+            "tracker list",
+            lambda: json.dumps(adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")).encode(),
+            lambda: serialization.dumps(serialization.rows_to_dicts(rows, schemas.TrackerResponse)),
+        ),
+        (
+            "progress cache hit",
+            lambda: json.dumps(jsonable_encoder({"data": json.loads(cached_body), "cached": True})).encode(),
+            lambda: serialization.wrap_cached(cached_body, True),
+        ),
+    ]
+
+    encoder = "orjson" if serialization.orjson is not None else "json (orjson not installed)"
+    print(f"{args.rows} rows, median of {args.runs} runs, fast path encoder: {encoder}")
+    for label, current, fast in cases:
+        current_ms = _median_ms(current, args.runs)
+        fast_ms = _median_ms(fast, args.runs)
+        print(f"{label:<20} current {current_ms:9.2f} ms  fast {fast_ms:9.2f} ms  {current_ms / max(fast_ms, 1e-6):6.1f}x")
+
+
+def benchmark_trends(args):
+    # In-memory only: a daily history with a few skipped days, shaped like the user_analysis query rows
+    days = args.years * 365
+    first_day = date.today() - timedelta(days=days)
+    rows = [
+        (first_day + timedelta(days=i), 6 + i % 3, 6000 + (i * 37) % 6000, 1800 + (i * 13) % 700, 1 + (i * 7) % 10, 1 + (i * 3) % 10)
+        for i in range(days)
+        if i % 11
+    ]
+    analyze_ms = _median_ms(lambda: trends.analyze(rows), args.runs)
+    analysis = trends.analyze(rows)
+    answer_ms = _median_ms(lambda: trends.answer_relationship_question("Is my mood affected by sleep?", analysis), args.runs)
+    print(
+        f"{args.years} years ({len(rows)} entries, {analysis['days_covered']} days), median of {args.runs} runs: "
+        f"analyze {analyze_ms:.2f} ms, answer from analysis {answer_ms:.3f} ms"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    recompute = subparsers.add_parser(
+        "recompute-goals",
+        help="Recompute goal progress from tracker history"
+    )
+    recompute.add_argument("--user-id", type=int, help="Only recompute goals of this user")
+    recompute.set_defaults(func=recompute_goals)
+
+    rebuild = subparsers.add_parser(
+        "rebuild-sketches",
+        help="Rebuild cohort percentile sketches from tracker history"
+    )
+    rebuild.set_defaults(func=rebuild_sketches)
+
+    backfill = subparsers.add_parser(
+        "backfill-rolling-stats",
+        help="Rebuild per-user rolling statistics from tracker history"
+    )
+    backfill.add_argument("--user-id", type=int, help="Only rebuild statistics of this user")
+    backfill.set_defaults(func=backfill_rolling_stats)
+
+    ensure = subparsers.add_parser(
+        "ensure-partitions",
+        help="Create upcoming monthly partitions"
+    )
+    ensure.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    ensure.add_argument(
+        "--months-back", type=int, default=PARTITION_MONTHS_BACK,
+        help="Give months found in the default partition their own partition, up to this many months back"
+    )
+    ensure.add_argument("--since", help="Also create partitions back to this month (YYYY-MM), e.g. after importing old history")
+    ensure.set_defaults(func=ensure_partitions)
+
+    archive = subparsers.add_parser(
+        "archive-insights",
+        help="Move AI insight partitions past the retention window to compressed archives"
+    )
+    archive.add_argument("--retention-months", type=int, default=INSIGHT_RETENTION_MONTHS)
+    archive.add_argument("--archive-dir", default=INSIGHT_ARCHIVE_DIR)
+    archive.set_defaults(func=archive_insights)
+
+    pruning = subparsers.add_parser(
+        "check-partition-pruning",
+        help="EXPLAIN a recent-range tracker query and verify older partitions are pruned"
+    )
+    pruning.add_argument("--user-id", type=int, default=1)
+    pruning.add_argument("--days", type=int, default=30)
+    pruning.set_defaults(func=check_partition_pruning)
+
+    directory = subparsers.add_parser(
+        "benchmark-user-directory",
+        help="Time admin user directory queries, optionally against seeded synthetic users (rolled back)"
+    )
+    directory.add_argument("--users", type=int, default=1000000, help="Synthetic users to seed; 0 to use existing rows only")
+    directory.add_argument("--limit", type=int, default=user_directory.DIRECTORY_PAGE_SIZE)
+    directory.add_argument("--runs", type=int, default=5)
+    directory.set_defaults(func=benchmark_user_directory)
+
+    serialization_bench = subparsers.add_parser(
+        "benchmark-serialization",
+        help="Compare the default response serialization with the fast path, in memory"
+    )
+    serialization_bench.add_argument("--rows", type=int, default=10000)
+    serialization_bench.add_argument("--runs", type=int, default=5)
+    serialization_bench.set_defaults(func=benchmark_serialization)
+
+    trends_bench = subparsers.add_parser(
+        "benchmark-trends",
+        help="Time the correlation, trend and weekday analysis over a synthetic multi-year history, in memory"
+    )
+    trends_bench.add_argument("--years", type=int, default=5)
+    trends_bench.add_argument("--runs", type=int, default=5)
+    trends_bench.set_defaults(func=benchmark_trends)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi.security import HTTPAuthorizationCredentials
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+from app.cache import get_data_version
+from app.oauth2 import bearer_scheme, token_user_id
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_get(resource: str, scope: str = "version"):
+    # Route dependency: answers 304 from the user's data version alone, before
+    # authentication or the endpoint touch the database. scope narrows the
+    # version to the table the resource is built from.
+    def dependency(
+        request: Request,
+        response: Response,
+        credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+    ):
+        user_id = token_user_id(credentials.credentials)
+        if user_id is None:
+            return
+
+        data_version = get_data_version(user_id, scope)
+        if data_version is None:
+            return
+        version, modified = data_version
+
+        # Date-relative views (e.g. "last 30 days") change at midnight without a write
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        last_modified = max(datetime.fromtimestamp(modified, timezone.utc), today)
+
+        digest = hashlib.sha1(
+            f"{sorted(request.query_params.multi_items())}|{today.date()}".encode()
+        ).hexdigest()[:12]
+        etag = f'W/"{resource}-{user_id}-{version}-{digest}"'
+
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(last_modified, usegmt=True),
+            "Cache-Control": "private, no-cache",
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, etag)
+        elif if_modified_since is not None:
+            not_modified = _not_modified_since(if_modified_since, last_modified)
+        else:
+            not_modified = False
+
+        if not_modified:
+            raise HTTPException(status_code=304, headers=headers)
+
+        response.headers.update(headers)
+
+    return dependency
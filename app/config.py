@@ -12,3 +12,52 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 # AI / Redis
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+# Database connection pools (primary and optional read replica)
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+REPLICA_POOL_SIZE = int(os.getenv("REPLICA_POOL_SIZE", str(DB_POOL_SIZE)))
+REPLICA_MAX_OVERFLOW = int(os.getenv("REPLICA_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+REPLICA_POOL_PRE_PING = os.getenv("REPLICA_POOL_PRE_PING", str(DB_POOL_PRE_PING)).lower() == "true"
+REPLICA_POOL_RECYCLE = int(os.getenv("REPLICA_POOL_RECYCLE", str(DB_POOL_RECYCLE)))
+# Seconds a user keeps reading from the primary after one of their writes
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Token budget for the wellness summary included in assistant prompts
+AI_CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "300"))
+
+# Assistant latency budget: past it (or while the circuit is open) a rules-based answer is returned
+AI_LATENCY_BUDGET_SECONDS = float(os.getenv("AI_LATENCY_BUDGET_SECONDS", "4"))
+AI_MAX_CONCURRENT_CALLS = int(os.getenv("AI_MAX_CONCURRENT_CALLS", "16"))
+AI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("AI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+AI_CIRCUIT_RESET_SECONDS = float(os.getenv("AI_CIRCUIT_RESET_SECONDS", "30"))
+
+# Partition maintenance and AI insight retention
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+# Monthly partitions are created at most this far back; older rows stay in the default partition
+PARTITION_MONTHS_BACK = int(os.getenv("PARTITION_MONTHS_BACK", "120"))
+INSIGHT_RETENTION_MONTHS = int(os.getenv("INSIGHT_RETENTION_MONTHS", "12"))
+INSIGHT_ARCHIVE_DIR = os.getenv("INSIGHT_ARCHIVE_DIR", "archive/insights")
+
+# Cache stampede protection: expired entries stay servable for the stale window
+# while one worker (holding the recompute lock) rebuilds them
+CACHE_STALE_SECONDS = int(os.getenv("CACHE_STALE_SECONDS", "120"))
+CACHE_LOCK_SECONDS = int(os.getenv("CACHE_LOCK_SECONDS", "30"))
+# How long a cold-key reader waits for another worker's compute before computing itself
+CACHE_COLD_WAIT_SECONDS = float(os.getenv("CACHE_COLD_WAIT_SECONDS", "2"))
+CACHE_XFETCH_BETA = float(os.getenv("CACHE_XFETCH_BETA", "1.0"))
+
+# Response compression: bodies under the threshold are sent as-is; brotli is
+# used when the client accepts it and the package is installed, else gzip
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Request profiling: admins capture on demand, and every request slower than
+# PROFILE_SLOW_MS is captured too (0 disables that)
+PROFILE_SLOW_MS = int(os.getenv("PROFILE_SLOW_MS", "500"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_MAX_CAPTURES = int(os.getenv("PROFILE_MAX_CAPTURES", "200"))
@@ -1,16 +1,45 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-import os
+from itertools import chain
+import time
+from app.config import (
+    DATABASE_URL,
+    REPLICA_DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    REPLICA_POOL_SIZE,
+    REPLICA_MAX_OVERFLOW,
+    REPLICA_POOL_PRE_PING,
+    REPLICA_POOL_RECYCLE,
+    READ_YOUR_WRITES_SECONDS,
+)
+from app.cache import redis_client, bump_data_versions
+from app import profiling
 
-load_dotenv()  # load .env file
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-engine = create_engine(DATABASE_URL)
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if REPLICA_DATABASE_URL:
+    read_engine = create_engine(
+        REPLICA_DATABASE_URL,
+        pool_size=REPLICA_POOL_SIZE,
+        max_overflow=REPLICA_MAX_OVERFLOW,
+        pool_pre_ping=REPLICA_POOL_PRE_PING,
+        pool_recycle=REPLICA_POOL_RECYCLE,
+    )
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -19,3 +48,88 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Callbacks run after commit with {user_id: {table names}} for every user whose rows changed
+write_listeners = []
+
+def on_user_write(listener):
+    write_listeners.append(listener)
+    return listener
+
+def mark_user_write(db, user_id: int, table: str = None):
+    # For Core statements (bulk upserts) that bypass the ORM unit of work
+    tables = db.info.setdefault("written_users", {}).setdefault(user_id, set())
+    if table:
+        tables.add(table)
+
+on_user_write(bump_data_versions)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_written_users(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table == "users":
+            user_id = obj.id
+        else:
+            user_id = getattr(obj, "user_id", None)
+        if user_id is not None:
+            mark_user_write(session, user_id, table)
+
+@event.listens_for(SessionLocal, "after_commit")
+def _notify_write_listeners(session):
+    writes = session.info.pop("written_users", None)
+    if not writes:
+        return
+    for listener in write_listeners:
+        try:
+            listener(writes)
+        except Exception:
+            pass
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_written_users(session):
+    session.info.pop("written_users", None)
+
+# Read-your-writes: users who just wrote keep reading from the primary for a short window
+_recent_writes = {}
+
+def _recent_write_key(user_id: int) -> str:
+    return f"db:recent_write:{user_id}"
+
+@on_user_write
+def _remember_recent_writes(writes):
+    if read_engine is engine:
+        return
+
+    if redis_client:
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for user_id in writes:
+                pipe.setex(_recent_write_key(user_id), READ_YOUR_WRITES_SECONDS, 1)
+            with profiling.section("redis"):
+                pipe.execute()
+            return
+        except Exception:
+            pass
+
+    now = time.monotonic()
+    if len(_recent_writes) > 10000:
+        for user_id, expires in list(_recent_writes.items()):
+            if expires < now:
+                _recent_writes.pop(user_id, None)
+    for user_id in writes:
+        _recent_writes[user_id] = now + READ_YOUR_WRITES_SECONDS
+
+def has_recent_write(user_id: int) -> bool:
+    if redis_client:
+        try:
+            with profiling.section("redis"):
+                return bool(redis_client.exists(_recent_write_key(user_id)))
+        except Exception:
+            pass
+    return _recent_writes.get(user_id, 0) > time.monotonic()
+
+def read_session_for(user_id: int):
+    if read_engine is engine or has_recent_write(user_id):
+        return SessionLocal()
+    return ReadSessionLocal()
@@ -0,0 +1,111 @@
+from app.config import REDIS_URL
+from app.cache import redis_client
+from app import profiling
+import redis.asyncio as aioredis
+import asyncio
+import json
+
+# Per-user change events ("tracker.created", "goal.updated", ...) published after
+# commit and streamed to clients over SSE. Redis pub/sub carries them between
+# nodes; each node holds a single pattern subscription however many clients are
+# connected and fans messages out to local queues. Without Redis (or while the
+# subscription is down) events are delivered to this node's clients directly.
+EVENT_CHANNEL_PREFIX = "events:user:"
+EVENT_QUEUE_SIZE = 100
+EVENT_RECONNECT_SECONDS = 5
+
+
+def _channel(user_id: int) -> str:
+    return f"{EVENT_CHANNEL_PREFIX}{user_id}"
+
+
+class EventBroker:
+    def __init__(self):
+        self.subscribers = {}
+        self.loop = None
+        self.listener = None
+        self.redis_connected = False
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self.subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self.subscribers[user_id]
+
+    def deliver(self, user_id: int, payload: str):
+        # Runs on the event loop. A client that stopped reading loses events
+        # rather than growing memory; it resyncs with conditional GETs.
+        for queue in self.subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                pass
+
+    def publish(self, user_id: int, event: dict):
+        # Safe to call from the sync routes' worker threads
+        payload = json.dumps(event, separators=(",", ":"), default=str)
+
+        if redis_client:
+            try:
+                with profiling.section("redis"):
+                    redis_client.publish(_channel(user_id), payload)
+                if self.redis_connected:
+                    return
+            except Exception:
+                pass
+
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.deliver, user_id, payload)
+
+    async def _listen(self):
+        while True:
+            client = aioredis.from_url(REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{EVENT_CHANNEL_PREFIX}*")
+                self.redis_connected = True
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    user_id = int(message["channel"][len(EVENT_CHANNEL_PREFIX):])
+                    self.deliver(user_id, message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            finally:
+                self.redis_connected = False
+                try:
+                    await pubsub.close()
+                    await client.close()
+                except Exception:
+                    pass
+            await asyncio.sleep(EVENT_RECONNECT_SECONDS)
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        if redis_client:
+            self.listener = self.loop.create_task(self._listen())
+
+    async def stop(self):
+        if self.listener:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+            self.listener = None
+
+
+event_broker = EventBroker()
+
+
+def publish(user_id: int, event_type: str, **fields):
+    event_broker.publish(user_id, {"type": event_type, **fields})
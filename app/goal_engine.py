@@ -0,0 +1,137 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Optional
+from app import models
+
+# goal_type -> (tracker metric, aggregation)
+# "avg" tracks the mean daily value inside the goal window, "sum" the running total.
+GOAL_RULES = {
+    "steps": ("steps", "avg"),
+    "daily_steps": ("steps", "avg"),
+    "total_steps": ("steps", "sum"),
+    "sleep": ("sleep_hours", "avg"),
+    "sleep_hours": ("sleep_hours", "avg"),
+    "calories": ("calories", "avg"),
+    "daily_calories": ("calories", "avg"),
+    "total_calories": ("calories", "sum"),
+    "mood": ("mood_score", "avg"),
+    "mood_score": ("mood_score", "avg"),
+    "stress": ("stress_level", "avg"),
+    "stress_level": ("stress_level", "avg"),
+}
+
+
+def goal_rule(goal_type: str):
+    key = goal_type.strip().lower().replace(" ", "_").replace("-", "_")
+    return GOAL_RULES.get(key)
+
+
+def _in_window(goal: models.Goal, tracker_date) -> bool:
+    start = goal.created_at.date() if goal.created_at else None
+    if start and tracker_date < start:
+        return False
+    if goal.deadline and tracker_date > goal.deadline:
+        return False
+    return True
+
+
+def _window_value(goal: models.Goal, values: Optional[dict], metric: str):
+    if values is None or values.get(metric) is None:
+        return None
+    if not _in_window(goal, values["date"]):
+        return None
+    return values[metric]
+
+
+def apply_tracker_change(db: Session, user_id: int, old: Optional[dict], new: Optional[dict]):
+    # old/new are the tracker's values before and after the write (None on create/delete).
+    # Runs inside the caller's transaction so goals commit together with the tracker.
+    # The goal rows stay locked until then, so concurrent writes of the same user
+    # apply their deltas one after the other; callers take this lock before
+    # rolling_stats takes its own, which keeps the lock order fixed.
+    goals = (
+        db.query(models.Goal)
+        .filter(models.Goal.user_id == user_id)
+        .order_by(models.Goal.id)
+        .with_for_update()
+        .all()
+    )
+
+    for goal in goals:
+        rule = goal_rule(goal.goal_type)
+        if not rule:
+            continue
+
+        metric, aggregation = rule
+        removed = _window_value(goal, old, metric)
+        added = _window_value(goal, new, metric)
+        if removed is None and added is None:
+            continue
+
+        current = goal.current_value or 0.0
+        count = goal.sample_count or 0
+
+        if aggregation == "sum":
+            goal.current_value = current + (added or 0) - (removed or 0)
+            goal.sample_count = count + (added is not None) - (removed is not None)
+            continue
+
+        total = current * count
+        if removed is not None:
+            total -= removed
+            count -= 1
+        if added is not None:
+            total += added
+            count += 1
+
+        goal.sample_count = count
+        goal.current_value = total / count if count > 0 else 0.0
+
+
+def recompute_goal(db: Session, goal: models.Goal):
+    rule = goal_rule(goal.goal_type)
+    if not rule:
+        return False
+
+    metric, aggregation = rule
+    column = getattr(models.Tracker, metric)
+
+    query = db.query(func.sum(column), func.count(column)).filter(
+        models.Tracker.user_id == goal.user_id
+    )
+    if goal.created_at:
+        query = query.filter(models.Tracker.date >= goal.created_at.date())
+    if goal.deadline:
+        query = query.filter(models.Tracker.date <= goal.deadline)
+
+    total, count = query.one()
+    total = float(total or 0)
+
+    goal.sample_count = count
+    if aggregation == "sum":
+        goal.current_value = total
+    else:
+        goal.current_value = total / count if count else 0.0
+
+    return True
+
+
+def recompute_goals(db: Session, user_id: Optional[int] = None, batch_size: int = 500) -> int:
+    query = db.query(models.Goal).order_by(models.Goal.id)
+    if user_id is not None:
+        query = query.filter(models.Goal.user_id == user_id)
+
+    updated = 0
+    last_id = 0
+    while True:
+        goals = query.filter(models.Goal.id > last_id).limit(batch_size).with_for_update().all()
+        if not goals:
+            break
+
+        for goal in goals:
+            if recompute_goal(db, goal):
+                updated += 1
+        last_id = goals[-1].id
+        db.commit()
+
+    return updated
@@ -0,0 +1,92 @@
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import date
+import hashlib
+from app import models, partitions
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def add_insight(db: Session, user_id: int, text: str, **usage) -> models.AIInsight:
+    # Identical texts (repeated rule-based insights, re-asked questions) share one
+    # content row. The no-op update locks an existing row until commit, so the
+    # archive job's orphan cleanup cannot delete it before the insight lands.
+    digest = content_hash(text)
+    stmt = pg_insert(models.AIInsightContent).values(content_hash=digest, text=text)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["content_hash"],
+        set_={"content_hash": stmt.excluded.content_hash}
+    ))
+
+    insight = models.AIInsight(user_id=user_id, content_hash=digest, **usage)
+    db.add(insight)
+    return insight
+
+
+def archive_old_insights(bind, retention_months: int, archive_dir: str) -> list:
+    # Moves monthly partitions older than the retention window to gzipped CSV
+    # files. Every step runs in its own short transaction, so ai_insights is
+    # never locked for longer than one partition move or detach.
+    cutoff = partitions.add_months(partitions.month_start(date.today()), -retention_months)
+
+    # Expired rows in the default partition (written before their month's partition
+    # existed) get that partition first, which moves them out, so they're archived too
+    default = partitions.default_partition_name("ai_insights")
+    with bind.connect() as conn:
+        expired_months = []
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": default}).scalar():
+            expired_months = conn.execute(text(
+                f"""
+                SELECT DISTINCT date_trunc('month', generated_at)::date
+                FROM {default}
+                WHERE generated_at < :cutoff
+                """
+            ), {"cutoff": cutoff}).scalars().all()
+        expired_partitions = [
+            name for name, month in partitions.list_partitions(conn, "ai_insights")
+            if partitions.add_months(month, 1) <= cutoff
+        ]
+    for month in expired_months:
+        with bind.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('ai_insights'))"))
+            if partitions.create_month_partition(conn, "ai_insights", "generated_at", month):
+                expired_partitions.append(partitions.partition_name("ai_insights", month))
+
+    archived = []
+    for name in sorted(set(expired_partitions)):
+        if partitions.add_months(month, 1) > cutoff:
+            continue
+        select_sql = (
+            "SELECT i.id, i.user_id, i.generated_at, c.text AS insight_text, "
+            "i.prompt_tokens, i.completion_tokens "
+            f"FROM {name} i JOIN ai_insight_contents c ON c.content_hash = i.content_hash "
+            "ORDER BY i.id"
+        )
+        archived.append(partitions.archive_partition(bind, "ai_insights", name, select_sql, archive_dir))
+
+    if archived:
+        # Rows add_insight is about to reuse are locked by it and skipped here. One
+        # reused after this statement's snapshot was taken fails the delete's
+        # foreign key check instead; the next run collects what is left.
+        try:
+            with bind.begin() as conn:
+                conn.execute(text(
+                    """
+                    DELETE FROM ai_insight_contents
+                    WHERE content_hash IN (
+                        SELECT c.content_hash FROM ai_insight_contents c
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM ai_insights i WHERE i.content_hash = c.content_hash
+                        )
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    """
+                ))
+        except IntegrityError:
+            pass
+
+    return archived
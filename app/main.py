@@ -1,14 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.database import engine, Base
-from app.routers import auth, users, trackers, goals, analytics, ai_assistant
+from app.config import PARTITION_MONTHS_AHEAD, PARTITION_MONTHS_BACK, COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+from app.compression import CompressionMiddleware
+from app.profiling import ProfilingMiddleware, ProfiledJSONResponse
+from app.oauth2 import SECRET_KEY
+from app.partitions import ensure_month_partitions
+from app.events import event_broker
+from app.routers import auth, users, trackers, goals, analytics, ai_assistant, exports, dashboard, events, profiling
 
 Base.metadata.create_all(bind=engine)
 
+with engine.begin() as conn:
+    ensure_month_partitions(conn, "trackers", "date", PARTITION_MONTHS_AHEAD, months_back=PARTITION_MONTHS_BACK)
+    ensure_month_partitions(conn, "ai_insights", "generated_at", PARTITION_MONTHS_AHEAD)
+
 app = FastAPI(
     title="AI-Powered Health & Wellness Tracker",
     description="Track your physical and mental wellness with AI insights",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ProfiledJSONResponse
 )
 
 origins = ["*"]
@@ -19,14 +30,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "Link", "X-Next-Cursor", "X-Profile-Id"],
+)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_BYTES,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
 )
 
+app.add_middleware(ProfilingMiddleware, secret=SECRET_KEY)
+
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(trackers.router)
 app.include_router(goals.router)
 app.include_router(analytics.router)
 app.include_router(ai_assistant.router)
+app.include_router(exports.router)
+app.include_router(dashboard.router)
+app.include_router(events.router)
+app.include_router(profiling.router)
+
+@app.on_event("startup")
+async def start_event_broker():
+    event_broker.start()
+
+@app.on_event("shutdown")
+async def stop_event_broker():
+    await event_broker.stop()
 
 @app.get("/")
 def read_root():
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Index, UniqueConstraint, DDL, event, func, Enum as SQLEnum
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.associationproxy import association_proxy
 from datetime import datetime
 import enum
 from app.database import Base
@@ -27,13 +28,42 @@ class User(Base):
     trackers = relationship("Tracker", back_populates="user", cascade="all, delete-orphan")
     goals = relationship("Goal", back_populates="user", cascade="all, delete-orphan")
     ai_insights = relationship("AIInsight", back_populates="user", cascade="all, delete-orphan")
+    metric_stats = relationship("UserMetricStat", back_populates="user", cascade="all, delete-orphan")
+
+# Admin directory: keyset pages on id under each filter, prefix search through
+# pattern-ops btrees and substring search through trigram GIN indexes
+Index("ix_users_role_id", User.role, User.id)
+Index("ix_users_activity_level_id", User.activity_level, User.id)
+Index("ix_users_created_at", User.created_at)
+Index(
+    "ix_users_name_prefix", func.lower(User.name).label("name_lower"),
+    postgresql_ops={"name_lower": "varchar_pattern_ops"}
+)
+Index(
+    "ix_users_email_prefix", func.lower(User.email).label("email_lower"),
+    postgresql_ops={"email_lower": "varchar_pattern_ops"}
+)
+Index(
+    "ix_users_name_trgm", func.lower(User.name).label("name_lower"),
+    postgresql_using="gin", postgresql_ops={"name_lower": "gin_trgm_ops"}
+)
+Index(
+    "ix_users_email_trgm", func.lower(User.email).label("email_lower"),
+    postgresql_using="gin", postgresql_ops={"email_lower": "gin_trgm_ops"}
+)
+event.listen(User.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
 
 class Tracker(Base):
     __tablename__ = "trackers"
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", name="uq_trackers_user_date"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    # Partitioned monthly on date, which therefore joins the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    date = Column(Date, nullable=False)
+    date = Column(Date, primary_key=True, nullable=False)
     steps = Column(Integer, nullable=True)
     calories = Column(Integer, nullable=True)
     sleep_hours = Column(Float, nullable=True)
@@ -51,17 +81,54 @@ class Goal(Base):
     goal_type = Column(String, nullable=False)
     target_value = Column(Float, nullable=False)
     current_value = Column(Float, default=0.0)
+    sample_count = Column(Integer, default=0, nullable=False)
     deadline = Column(Date, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", back_populates="goals")
 
+class AIInsightContent(Base):
+    __tablename__ = "ai_insight_contents"
+    
+    # sha256 of the text; identical answers are stored once
+    content_hash = Column(String(64), primary_key=True)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class AIInsight(Base):
     __tablename__ = "ai_insights"
+    __table_args__ = (
+        Index("ix_ai_insights_user_generated", "user_id", "generated_at"),
+        {"postgresql_partition_by": "RANGE (generated_at)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    # Partitioned monthly on generated_at, which therefore joins the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    generated_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    insight_text = Column(Text, nullable=False)  # <-- change here
-    generated_at = Column(DateTime, default=datetime.utcnow)
+    content_hash = Column(String(64), ForeignKey("ai_insight_contents.content_hash"), nullable=False, index=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
     
     user = relationship("User", back_populates="ai_insights")
+    content = relationship("AIInsightContent", lazy="joined")
+    insight_text = association_proxy("content", "text")
+
+class UserMetricStat(Base):
+    __tablename__ = "user_metric_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    metric = Column(String, primary_key=True)
+    mean = Column(Float, nullable=False, default=0.0)
+    variance = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+    last_value = Column(Float, nullable=True)
+    last_date = Column(Date, nullable=True)
+    # State before the latest observation, so an edit of that day can be replayed
+    prev_mean = Column(Float, nullable=True)
+    prev_variance = Column(Float, nullable=True)
+    prev_count = Column(Integer, nullable=True)
+    prev_date = Column(Date, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    user = relationship("User", back_populates="metric_stats")
@@ -5,7 +5,7 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 import os
 from app import schemas, models
-from app.database import get_db
+from app.database import get_db, read_session_for, SessionLocal
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
@@ -37,11 +37,16 @@ def verify_access_token(token: str, credentials_exception):
     
     return token_data
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db)
-):
-    token = credentials.credentials
+def token_user_id(token: str):
+    # Signature and expiry checked, but no database lookup: for dependencies
+    # that must not hold a session (conditional GETs, long-lived streams)
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("user_id")
+
+def _user_from_token(token: str, db: Session):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -53,10 +58,38 @@ def get_current_user(
         raise credentials_exception
     return user
 
-def get_current_admin_user(current_user: models.User = Depends(get_current_user)):
-    if current_user.role != models.UserRole.ADMIN:
+def _require_admin(user: models.User):
+    if user.role != models.UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
-    return current_user
+    return user
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: Session = Depends(get_db)
+):
+    return _user_from_token(credentials.credentials, db)
+
+def get_read_db(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
+    # Picks the replica from the token alone, so read-only requests never open a
+    # primary connection; tokens without a user_id claim stay on the primary
+    user_id = token_user_id(credentials.credentials)
+    db = read_session_for(user_id) if user_id is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_current_read_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: Session = Depends(get_read_db)
+):
+    return _user_from_token(credentials.credentials, db)
+
+def get_current_admin_user(current_user: models.User = Depends(get_current_user)):
+    return _require_admin(current_user)
+
+def get_current_read_admin_user(current_user: models.User = Depends(get_current_read_user)):
+    return _require_admin(current_user)
@@ -0,0 +1,160 @@
+from datetime import date, datetime
+from sqlalchemy import text
+import gzip
+import os
+
+# Monthly range partitions: <table>_pYYYYMM covers [first of month, first of next month)
+# and <table>_default catches anything no monthly partition covers yet.
+
+
+def month_start(day) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def ensure_default_partition(conn, table: str):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} PARTITION OF {table} DEFAULT"
+    ))
+
+
+def list_partitions(conn, table: str) -> list:
+    # Returns [(partition name, first month)] for the monthly partitions of `table`
+    rows = conn.execute(text(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+        """
+    ), {"table": table}).scalars()
+
+    prefix = f"{table}_p"
+    partitions = []
+    for name in rows:
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            partitions.append((name, date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def create_month_partition(conn, table: str, column: str, month: date):
+    name = partition_name(table, month)
+    default = default_partition_name(table)
+    start, end = month_start(month), add_months(month, 1)
+
+    exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+    if exists:
+        return False
+
+    has_default = conn.execute(text("SELECT to_regclass(:name)"), {"name": default}).scalar()
+    if not has_default:
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+        return True
+
+    # Rows for this month may already sit in the default partition; attaching a
+    # new partition would then fail, so move them into it before attaching.
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"""
+        WITH moved AS (
+            DELETE FROM {default}
+            WHERE {column} >= '{start}' AND {column} < '{end}'
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+        """
+    ))
+    conn.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+    return True
+
+
+def is_partitioned(conn, table: str) -> bool:
+    return bool(conn.execute(text(
+        """
+        SELECT 1 FROM pg_partitioned_table
+        JOIN pg_class ON pg_class.oid = pg_partitioned_table.partrelid
+        WHERE pg_class.relname = :table
+        """
+    ), {"table": table}).scalar())
+
+
+def ensure_month_partitions(conn, table: str, column: str, months_ahead: int = 3, since: date = None, months_back: int = None) -> int:
+    # A database that hasn't been migrated yet still has the plain table
+    if not is_partitioned(conn, table):
+        return 0
+
+    # Serialises concurrent callers (e.g. several workers starting at once)
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:table))"), {"table": table})
+    ensure_default_partition(conn, table)
+
+    first = month_start(since or date.today())
+    if months_back is not None:
+        # Rows that landed in the default partition (a fresh database, imported
+        # history) get their months too, but no further back than months_back
+        oldest = conn.execute(text(f"SELECT MIN({column}) FROM {default_partition_name(table)}")).scalar()
+        if oldest is not None:
+            floor = add_months(month_start(date.today()), -months_back)
+            first = min(first, max(month_start(oldest), floor))
+    last = add_months(month_start(date.today()), months_ahead)
+
+    created = 0
+    month = first
+    while month <= last:
+        if create_month_partition(conn, table, column, month):
+            created += 1
+        month = add_months(month, 1)
+    return created
+
+
+def scanned_relations(conn, sql: str, params: dict = None) -> set:
+    # Relations the planner will actually read for `sql` (pruned partitions are absent)
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params or {}).scalar()
+
+    relations = set()
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Relation Name" in node:
+            relations.add(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return relations
+
+
+def archive_partition(bind, table: str, name: str, select_sql: str, archive_dir: str) -> str:
+    # Streams `select_sql` (which reads from the partition) into a gzipped CSV in
+    # archive_dir while the partition is still attached, then detaches and drops
+    # it in a short transaction of its own: DETACH locks the whole parent table,
+    # so it must not wait on the COPY. Archived months no longer receive writes.
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}_{datetime.utcnow():%Y%m%d%H%M%S}.csv.gz")
+
+    with bind.connect() as conn:
+        cursor = conn.connection.cursor()
+        try:
+            with gzip.open(path, "wt", encoding="utf-8", newline="") as archive:
+                cursor.copy_expert(f"COPY ({select_sql}) TO STDOUT WITH CSV HEADER", archive)
+        finally:
+            cursor.close()
+
+    with bind.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+    return path
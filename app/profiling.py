@@ -0,0 +1,365 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter, deque
+from datetime import datetime
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+from app.config import PROFILE_SLOW_MS, PROFILE_SAMPLE_INTERVAL_MS, PROFILE_MAX_CAPTURES
+from app import cache
+import anyio
+import asyncio
+import functools
+import hashlib
+import hmac
+import json
+import sys
+import threading
+import time
+import uuid
+
+# Per-request profiling. A request is captured when it carries a valid signed
+# X-Profile header, when an admin has switched profiling on for its user, or
+# (PROFILE_SLOW_MS, 500 by default) once it has run longer than the
+# threshold. A capture records time spent in SQL (engine events), in the app's
+# own Redis calls, the Gemini call and the fast-path encoder (section() at those
+# call sites), FastAPI's own response encoding (ProfiledRoute and
+# ProfiledJSONResponse), plus stack samples of the threads that worked on the
+# request.
+#
+# Instrumentation checks a context variable and does nothing else when no
+# profile is active. With a slow threshold every request gets a Profile and a
+# timer, but counters only, no stack sampling, until it crosses the threshold;
+# with PROFILE_SLOW_MS=0 no profile is ever created unless asked for. The cache, serialization and database modules import this one, so
+# it reads the cache module's attributes at call time and imports oauth2 late.
+PROFILE_HEADER = "x-profile"
+PROFILE_CATEGORIES = ["sql", "redis", "gemini", "serialization"]
+PROFILE_MAX_STACKS = 50
+PROFILE_STACK_DEPTH = 40
+PROFILE_TOGGLE_REFRESH_SECONDS = 5
+PROFILE_CAPTURES_KEY = "profiling:captures"
+PROFILE_USERS_KEY = "profiling:users"
+# Long-lived streams are never "slow" in the sense that matters here
+PROFILE_EXCLUDED_PREFIXES = ("/events/",)
+
+current_profile = ContextVar("current_profile", default=None)
+
+# In-process fallbacks when Redis is unavailable
+_local_captures = deque(maxlen=PROFILE_MAX_CAPTURES)
+_local_users = {}
+
+
+class Profile:
+    def __init__(self, trigger: str = None):
+        self.id = uuid.uuid4().hex
+        self.trigger = trigger
+        self.timings = dict.fromkeys(PROFILE_CATEGORIES, 0.0)
+        self.counts = dict.fromkeys(PROFILE_CATEGORIES, 0)
+        self.threads = {threading.get_ident()}
+        self.samples = Counter()
+        self.sampler = None
+        self.lock = threading.Lock()
+        # Set by ProfiledRoute when the endpoint returns a value FastAPI still has to encode
+        self.endpoint_returned_at = None
+
+    def add(self, category: str, seconds: float):
+        with self.lock:
+            self.timings[category] += seconds
+            self.counts[category] += 1
+            self.threads.add(threading.get_ident())
+
+    def start_sampling(self, trigger: str):
+        if self.sampler is None:
+            self.trigger = self.trigger or trigger
+            self.sampler = _StackSampler(self)
+            self.sampler.start()
+
+    def stop_sampling(self):
+        if self.sampler is not None:
+            self.sampler.stop.set()
+
+
+def _stack_key(frame) -> str:
+    names = []
+    while frame is not None and len(names) < PROFILE_STACK_DEPTH:
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _StackSampler(threading.Thread):
+    # Samples the threads that did instrumented work for the request (and the
+    # event loop thread); a pooled worker thread picked up by another request
+    # before this one finishes may add a few unrelated samples.
+    def __init__(self, profile: Profile):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.profile = profile
+        self.stop = threading.Event()
+
+    def run(self):
+        interval = PROFILE_SAMPLE_INTERVAL_MS / 1000
+        while not self.stop.wait(interval):
+            frames = sys._current_frames()
+            with self.profile.lock:
+                threads = list(self.profile.threads)
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.profile.samples[_stack_key(frame)] += 1
+
+
+
+@contextmanager
+def section(category: str):
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(category, time.perf_counter() - started)
+
+
+def _mark_endpoint_return(call):
+    # Sync endpoints run in a worker thread with a copy of the request's
+    # context, which still holds the same Profile object
+    def returned():
+        profile = current_profile.get()
+        if profile is not None:
+            profile.endpoint_returned_at = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(*args, **kwargs):
+            result = await call(*args, **kwargs)
+            returned()
+            return result
+    else:
+        @functools.wraps(call)
+        def endpoint(*args, **kwargs):
+            result = call(*args, **kwargs)
+            returned()
+            return result
+    return endpoint
+
+
+class ProfiledRoute(APIRoute):
+    # After the endpoint returns, FastAPI validates the value against the
+    # response_model, runs jsonable_encoder and builds the response class;
+    # with ProfiledJSONResponse as that class, the whole stretch is timed as
+    # "serialization". Dependency teardown runs later and isn't included.
+    def get_route_handler(self):
+        self.dependant.call = _mark_endpoint_return(self.dependant.call)
+        return super().get_route_handler()
+
+
+class ProfiledJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        body = super().render(content)
+        profile = current_profile.get()
+        if profile is not None and profile.endpoint_returned_at is not None:
+            profile.add("serialization", time.perf_counter() - profile.endpoint_returned_at)
+            profile.endpoint_returned_at = None
+        return body
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    started = conn.info.get("profile_started")
+    if profile is not None and started:
+        profile.add("sql", time.perf_counter() - started.pop())
+
+
+def sign_profile_token(secret: str, expires_at: int) -> str:
+    digest = hmac.new(secret.encode(), f"profile:{expires_at}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires_at}.{digest}"
+
+
+def verify_profile_token(secret: str, token: str) -> bool:
+    expires_at, _, digest = token.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(sign_profile_token(secret, int(expires_at)), token)
+
+
+def enable_for_user(user_id: int, minutes: int):
+    # _local_users is read without a lock, so it is only ever replaced, never mutated
+    global _local_users
+    expires_at = time.time() + minutes * 60
+    _local_users = {**_local_users, user_id: expires_at}
+    if cache.redis_client:
+        try:
+            cache.redis_client.hset(PROFILE_USERS_KEY, user_id, expires_at)
+        except Exception:
+            pass
+    return expires_at
+
+
+def disable_for_user(user_id: int):
+    global _local_users
+    _local_users = {uid: expires_at for uid, expires_at in _local_users.items() if uid != user_id}
+    if cache.redis_client:
+        try:
+            cache.redis_client.hdel(PROFILE_USERS_KEY, user_id)
+        except Exception:
+            pass
+
+
+def _load_profiled_users():
+    # Refreshes this node's view of the admin toggles; requests read the old
+    # mapping until the new one is swapped in by a single assignment
+    global _local_users
+    if not cache.redis_client:
+        return
+    try:
+        stored = cache.redis_client.hgetall(PROFILE_USERS_KEY)
+    except Exception:
+        return
+    now = time.time()
+    _local_users = {
+        int(user_id): float(expires_at)
+        for user_id, expires_at in stored.items()
+        if float(expires_at) > now
+    }
+
+
+def store_capture(capture: dict):
+    if cache.redis_client:
+        try:
+            pipe = cache.redis_client.pipeline(transaction=False)
+            pipe.lpush(PROFILE_CAPTURES_KEY, json.dumps(capture))
+            pipe.ltrim(PROFILE_CAPTURES_KEY, 0, PROFILE_MAX_CAPTURES - 1)
+            pipe.execute()
+            return
+        except Exception:
+            pass
+    _local_captures.appendleft(capture)
+
+
+def list_captures(limit: int) -> list:
+    if cache.redis_client:
+        try:
+            return [json.loads(raw) for raw in cache.redis_client.lrange(PROFILE_CAPTURES_KEY, 0, limit - 1)]
+        except Exception:
+            pass
+    return list(_local_captures)[:limit]
+
+
+def get_capture(capture_id: str):
+    for capture in list_captures(PROFILE_MAX_CAPTURES):
+        if capture["id"] == capture_id:
+            return capture
+    return None
+
+
+def _build_capture(profile: Profile, scope, status_code: int, duration: float, user_id) -> dict:
+    timings_ms = {category: round(seconds * 1000, 2) for category, seconds in profile.timings.items()}
+    accounted = sum(profile.timings.values())
+    return {
+        "id": profile.id,
+        "trigger": profile.trigger,
+        "method": scope["method"],
+        "path": scope["path"],
+        "query": scope.get("query_string", b"").decode("latin-1"),
+        "status_code": status_code,
+        "user_id": user_id,
+        "started_at": datetime.utcnow().isoformat(),
+        "duration_ms": round(duration * 1000, 2),
+        "breakdown_ms": {**timings_ms, "other": round(max(duration - accounted, 0) * 1000, 2)},
+        "calls": profile.counts,
+        "samples": [
+            {"stack": stack, "count": count}
+            for stack, count in profile.samples.most_common(PROFILE_MAX_STACKS)
+        ],
+        "sample_interval_ms": PROFILE_SAMPLE_INTERVAL_MS,
+    }
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, secret: str):
+        self.app = app
+        self.secret = secret
+        self.toggles_loaded_at = 0.0
+
+    async def _refresh_toggles(self):
+        now = time.monotonic()
+        if now - self.toggles_loaded_at >= PROFILE_TOGGLE_REFRESH_SECONDS:
+            self.toggles_loaded_at = now
+            await anyio.to_thread.run_sync(_load_profiled_users)
+
+    def _requested(self, headers: Headers) -> str:
+        token = headers.get(PROFILE_HEADER)
+        if token and verify_profile_token(self.secret, token):
+            return "header"
+        if _local_users:
+            user_id = self._user_id(headers)
+            if user_id is not None and _local_users.get(user_id, 0) > time.time():
+                return "toggle"
+        return None
+
+    @staticmethod
+    def _user_id(headers: Headers):
+        authorization = headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            # oauth2 imports the database, which imports this module
+            from app import oauth2
+            return oauth2.token_user_id(authorization[7:])
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(PROFILE_EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        await self._refresh_toggles()
+        headers = Headers(scope=scope)
+        trigger = self._requested(headers)
+        if trigger is None and PROFILE_SLOW_MS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile()
+        if trigger:
+            profile.start_sampling(trigger)
+            slow_timer = None
+        else:
+            slow_timer = asyncio.get_running_loop().call_later(
+                PROFILE_SLOW_MS / 1000, profile.start_sampling, "slow"
+            )
+
+        status_code = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if profile.sampler is not None:
+                    MutableHeaders(scope=message)["X-Profile-Id"] = profile.id
+            await send(message)
+
+        started = time.perf_counter()
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            duration = time.perf_counter() - started
+            current_profile.reset(token)
+            if slow_timer is not None:
+                slow_timer.cancel()
+            profile.stop_sampling()
+
+            if profile.sampler is not None or 0 < PROFILE_SLOW_MS <= duration * 1000:
+                profile.trigger = profile.trigger or "slow"
+                capture = _build_capture(profile, scope, status_code, duration, self._user_id(headers))
+                await anyio.to_thread.run_sync(store_capture, capture)
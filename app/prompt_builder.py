@@ -0,0 +1,126 @@
+from google.genai import types
+from typing import Optional
+import math
+from app import rolling_stats
+
+SYSTEM_INSTRUCTION = (
+    "You are a friendly and professional AI health assistant. "
+    "Always provide answers in a structured, readable plain text format. "
+    "Do not include any Markdown symbols like ** or #. "
+    "Do not write literal text such as 'Bold heading:' or 'Bold subheading:'. "
+    "Do not use bullet points or code blocks.\n\n"
+
+    "Structure the response like this:\n"
+    "1. Summary: One short paragraph (2-3 lines) summarizing the answer.\n"
+    "2. Key Details:\n"
+    "   Sleep: 1-3 sentences about sleep.\n"
+    "   Steps: 1-3 sentences about activity/steps.\n"
+    "   Mood: 1-3 sentences about mood.\n"
+    "   Stress: 1-3 sentences about stress.\n"
+    "   General Explanation: 1-3 sentences about overall health context.\n"
+    "3. Recommendation: Short, clear actionable advice.\n\n"
+
+    "Make headings visually distinct by capitalizing or writing on a separate line, "
+    "subheadings slightly indented or on their own line. Keep the tone supportive, positive, and easy to read.\n\n"
+
+    "The user's wellness data is given as a compact summary: 'avg' values are "
+    "exponentially weighted recent averages and 'sd' their standard deviation."
+)
+
+# Built once and reused: the static instruction travels as a system
+# instruction instead of being re-sent inside every prompt body.
+GENERATION_CONFIG = types.GenerateContentConfig(system_instruction=SYSTEM_INSTRUCTION)
+
+RECENT_DAYS = 7
+CHARS_PER_TOKEN = 4
+
+METRIC_SHORT_NAMES = {
+    "sleep_hours": "sleep",
+    "steps": "steps",
+    "calories": "kcal",
+    "mood_score": "mood",
+    "stress_level": "stress",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    # Gemini tokenizes English at roughly four characters per token
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def format_number(value) -> str:
+    if value is None:
+        return "-"
+    if float(value).is_integer():
+        return str(int(value))
+    return f"{value:.1f}"
+
+
+def _tracker_line(tracker) -> str:
+    values = " ".join(
+        f"{short}={format_number(getattr(tracker, metric))}"
+        for metric, short in METRIC_SHORT_NAMES.items()
+    )
+    return f"{tracker.date}: {values}"
+
+
+def build_context(stats: dict, recent_trackers: list, token_budget: int) -> str:
+    # Most useful lines first; stop adding once the budget is spent
+    lines = []
+
+    if recent_trackers:
+        lines.append(f"Latest ({_tracker_line(recent_trackers[0])})")
+
+    baselines = []
+    for metric, short in METRIC_SHORT_NAMES.items():
+        stat = stats.get(metric)
+        if stat is None or not stat.count:
+            continue
+        baselines.append(
+            f"{short} avg {format_number(stat.mean)} sd {format_number(math.sqrt(max(stat.variance, 0)))}"
+        )
+    if baselines:
+        lines.append("Baseline: " + ", ".join(baselines))
+
+    for flag in rolling_stats.anomaly_flags(stats):
+        lines.append(
+            f"Unusual {METRIC_SHORT_NAMES[flag['metric']]}: {format_number(flag['value'])} "
+            f"vs usual {format_number(flag['baseline'])} (z={flag['z_score']})"
+        )
+
+    if len(recent_trackers) > 1:
+        lines.append("Previous days:")
+        lines.extend(_tracker_line(tracker) for tracker in recent_trackers[1:])
+
+    context = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            break
+        context.append(line)
+        used += cost
+
+    return "\n".join(context) if context else "No wellness data logged yet."
+
+
+def build_contents(message: str, context: str) -> str:
+    return (
+        "User's recent wellness data:\n"
+        f"{context}\n\n"
+        f"User question: {message}"
+    )
+
+
+def count_prompt_tokens(contents: str) -> int:
+    return estimate_tokens(SYSTEM_INSTRUCTION) + estimate_tokens(contents)
+
+
+def usage_from_response(response, estimated_prompt_tokens: Optional[int] = None) -> dict:
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) if usage else None
+    completion_tokens = getattr(usage, "candidates_token_count", None) if usage else None
+    return {
+        "prompt_tokens": prompt_tokens if prompt_tokens is not None else estimated_prompt_tokens,
+        "completion_tokens": completion_tokens,
+    }
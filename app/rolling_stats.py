@@ -0,0 +1,158 @@
+from sqlalchemy.orm import Session
+from typing import Optional
+import math
+from app import models
+
+ROLLING_METRICS = ["sleep_hours", "steps", "calories", "mood_score", "stress_level"]
+
+# Smoothing factor of the exponentially weighted mean/variance (~14-day span)
+ROLLING_ALPHA = 2 / (14 + 1)
+ANOMALY_Z_THRESHOLD = 2.0
+ANOMALY_MIN_SAMPLES = 5
+
+# Which side of the baseline counts as a problem
+ANOMALY_DIRECTIONS = {
+    "sleep_hours": -1,
+    "steps": -1,
+    "mood_score": -1,
+    "stress_level": 1,
+}
+
+
+def _snapshot(stat: models.UserMetricStat):
+    stat.prev_mean = stat.mean
+    stat.prev_variance = stat.variance
+    stat.prev_count = stat.count
+    stat.prev_date = stat.last_date
+
+
+def _has_snapshot(stat: models.UserMetricStat) -> bool:
+    return stat.prev_count is not None
+
+
+def _restore_snapshot(stat: models.UserMetricStat):
+    stat.mean = stat.prev_mean
+    stat.variance = stat.prev_variance
+    stat.count = stat.prev_count
+    stat.last_date = stat.prev_date
+    stat.last_value = None
+    # Only one level of history is kept
+    stat.prev_mean = stat.prev_variance = stat.prev_count = stat.prev_date = None
+
+
+def _observe(stat: models.UserMetricStat, value: float, day):
+    if not stat.count:
+        stat.mean = float(value)
+        stat.variance = 0.0
+    else:
+        diff = value - stat.mean
+        increment = ROLLING_ALPHA * diff
+        stat.mean += increment
+        stat.variance = (1 - ROLLING_ALPHA) * (stat.variance + diff * increment)
+    stat.count = (stat.count or 0) + 1
+    stat.last_value = float(value)
+    stat.last_date = day
+
+
+def load(db: Session, user_id: int, for_update: bool = False) -> dict:
+    query = db.query(models.UserMetricStat).filter(models.UserMetricStat.user_id == user_id)
+    if for_update:
+        query = query.with_for_update()
+    return {stat.metric: stat for stat in query.all()}
+
+
+def apply_tracker_change(db: Session, user_id: int, old: Optional[dict], new: Optional[dict]):
+    # O(1) per metric. Only the newest day is tracked exactly: writes to older
+    # days are left for the backfill command to fold in.
+    stats = load(db, user_id, for_update=True)
+
+    for metric in ROLLING_METRICS:
+        stat = stats.get(metric)
+        old_value = old.get(metric) if old else None
+        new_value = new.get(metric) if new else None
+
+        if stat is not None and old_value is not None and old["date"] == stat.last_date:
+            if _has_snapshot(stat):
+                _restore_snapshot(stat)
+            elif new_value is None or new["date"] != old["date"]:
+                continue
+
+        if new_value is None:
+            continue
+
+        if stat is None:
+            stat = models.UserMetricStat(user_id=user_id, metric=metric, mean=0.0, variance=0.0, count=0)
+            db.add(stat)
+            stats[metric] = stat
+
+        if stat.last_date is None or new["date"] > stat.last_date:
+            _snapshot(stat)
+            _observe(stat, new_value, new["date"])
+
+
+def z_score(stat: models.UserMetricStat):
+    # Compares the latest value against the baseline from before it was recorded
+    if stat.last_value is None or not _has_snapshot(stat):
+        return None
+    if (stat.prev_count or 0) < ANOMALY_MIN_SAMPLES or stat.prev_variance <= 0:
+        return None
+    return (stat.last_value - stat.prev_mean) / math.sqrt(stat.prev_variance)
+
+
+def anomaly_flags(stats: dict) -> list:
+    flags = []
+    for metric, direction in ANOMALY_DIRECTIONS.items():
+        stat = stats.get(metric)
+        if stat is None:
+            continue
+        z = z_score(stat)
+        if z is not None and z * direction >= ANOMALY_Z_THRESHOLD:
+            flags.append({
+                "metric": metric,
+                "value": stat.last_value,
+                "baseline": round(stat.prev_mean, 2),
+                "z_score": round(z, 2),
+            })
+    return flags
+
+
+def rebuild(db: Session, user_id: Optional[int] = None, batch_size: int = 5000) -> int:
+    query = db.query(models.UserMetricStat)
+    if user_id is not None:
+        query = query.filter(models.UserMetricStat.user_id == user_id)
+    query.delete(synchronize_session=False)
+
+    columns = [models.Tracker.user_id, models.Tracker.date] + [
+        getattr(models.Tracker, metric) for metric in ROLLING_METRICS
+    ]
+    rows = db.query(*columns)
+    if user_id is not None:
+        rows = rows.filter(models.Tracker.user_id == user_id)
+    rows = rows.order_by(models.Tracker.user_id, models.Tracker.date).yield_per(batch_size)
+
+    users = 0
+    current_user_id = None
+    stats = {}
+    for row in rows:
+        if row.user_id != current_user_id:
+            db.add_all(stats.values())
+            current_user_id = row.user_id
+            stats = {}
+            users += 1
+            if users % 100 == 0:
+                db.flush()
+
+        for metric in ROLLING_METRICS:
+            value = getattr(row, metric)
+            if value is None:
+                continue
+            stat = stats.get(metric)
+            if stat is None:
+                stat = models.UserMetricStat(user_id=row.user_id, metric=metric, mean=0.0, variance=0.0, count=0)
+                stats[metric] = stat
+            _snapshot(stat)
+            _observe(stat, value, row.date)
+
+    db.add_all(stats.values())
+    db.commit()
+    return users
@@ -1,12 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from app import models, schemas, oauth2
-from app.database import get_db
-from app.config import GEMINI_API_KEY, REDIS_URL
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import partial
+import hashlib
+import threading
+from app import models, schemas, oauth2, events, insight_store, profiling, prompt_builder, rolling_stats, serialization, trends, utils
+from app.circuit_breaker import CircuitBreaker
+from app.database import get_db, SessionLocal
+from app.conditional import conditional_get
+from app.config import (
+    GEMINI_API_KEY,
+    REDIS_URL,
+    AI_CONTEXT_TOKEN_BUDGET,
+    AI_LATENCY_BUDGET_SECONDS,
+    AI_MAX_CONCURRENT_CALLS,
+    AI_CIRCUIT_FAILURE_THRESHOLD,
+    AI_CIRCUIT_RESET_SECONDS,
+)
 import redis
 from google import genai
 
-router = APIRouter(prefix="/ai", tags=["AI Assistant"])
+router = APIRouter(prefix="/ai", tags=["AI Assistant"], route_class=profiling.ProfiledRoute)
 
 # Redis Setup
 try:
@@ -21,59 +35,136 @@ if not GEMINI_API_KEY:
 genai_client = genai.Client(api_key=GEMINI_API_KEY)
 AI_MODEL = "gemini-2.5-flash"
 
+# Model calls run on their own pool so a request can stop waiting at the latency budget
+ai_executor = ThreadPoolExecutor(max_workers=AI_MAX_CONCURRENT_CALLS, thread_name_prefix="gemini")
+ai_circuit = CircuitBreaker(AI_CIRCUIT_FAILURE_THRESHOLD, AI_CIRCUIT_RESET_SECONDS)
+# A call is only submitted when a worker is free; queueing behind a saturated
+# pool would spend the latency budget waiting and look like a Gemini failure
+ai_slots = threading.BoundedSemaphore(AI_MAX_CONCURRENT_CALLS)
+
+ANOMALY_MESSAGES = {
+    "sleep_hours": "You're sleeping much less than usual ({value:.1f} hrs vs your typical {baseline:.1f} hrs). Try winding down earlier.",
+    "steps": "Your steps are well below your usual level (about {baseline:.0f}). Consider taking a light walk today.",
+    "stress_level": "Stress levels are noticeably higher than your norm. Try some breathing exercises.",
+    "mood_score": "Your mood is lower than usual. Try a relaxing activity or talk to someone you trust.",
+}
+
 # AI Insight Generator
 @router.post("/insight")
 def generate_insight(
     current_user: models.User = Depends(oauth2.get_current_user),
     db: Session = Depends(get_db)
 ):
-    latest_trackers = (
-        db.query(models.Tracker)
-        .filter(models.Tracker.user_id == current_user.id)
-        .order_by(models.Tracker.date.desc())
-        .limit(7)
-        .all()
-    )
-
-    if not latest_trackers:
-        raise HTTPException(
-            status_code=404,
-            detail="No tracker data found. Please log your wellness data first."
-        )
-
-    latest = latest_trackers[0]
-
-    insights = []
-    if len(latest_trackers) > 1:
-        avg_sleep = sum(t.sleep_hours or 0 for t in latest_trackers) / len(latest_trackers)
-        avg_steps = sum(t.steps or 0 for t in latest_trackers) / len(latest_trackers)
-        avg_stress = sum(t.stress_level or 0 for t in latest_trackers) / len(latest_trackers)
+    stats = rolling_stats.load(db, current_user.id)
 
-        if (latest.sleep_hours or 0) < avg_sleep - 1:
-            insights.append(f"You're sleeping less than your weekly average ({avg_sleep:.1f} hrs). Try winding down earlier.")
+    if not stats:
+        has_trackers = db.query(models.Tracker.id).filter(
+            models.Tracker.user_id == current_user.id
+        ).first()
+        if not has_trackers:
+            raise HTTPException(
+                status_code=404,
+                detail="No tracker data found. Please log your wellness data first."
+            )
+        # History logged before rolling statistics existed
+        rolling_stats.rebuild(db, user_id=current_user.id)
+        stats = rolling_stats.load(db, current_user.id)
 
-        if (latest.steps or 0) < avg_steps * 0.7:
-            insights.append("Your steps are lower than usual. Consider taking a light walk today.")
+    anomalies = rolling_stats.anomaly_flags(stats)
 
-        if (latest.stress_level or 0) > avg_stress + 2:
-            insights.append("Stress levels are higher than your average. Try some breathing exercises.")
+    if stats and max(stat.count for stat in stats.values()) > 1:
+        insights = [ANOMALY_MESSAGES[flag["metric"]].format(**flag) for flag in anomalies]
 
-        if (latest.mood_score or 0) < 5:
+        mood = stats.get("mood_score")
+        if mood and mood.last_value is not None and mood.last_value < 5 and not any(
+            flag["metric"] == "mood_score" for flag in anomalies
+        ):
             insights.append("Your mood score seems low. Try a relaxing activity or talk to someone you trust.")
 
         insight_text = " ".join(insights) if insights else "You're maintaining consistent wellness habits!"
     else:
         insight_text = "Start logging daily to receive personalized insights."
 
-    new_insight = models.AIInsight(
-        user_id=current_user.id,
-        insight_text=insight_text
-    )
-    db.add(new_insight)
+    new_insight = insight_store.add_insight(db, current_user.id, insight_text)
     db.commit()
     db.refresh(new_insight)
+    events.publish(current_user.id, "insight.created", id=new_insight.id)
+
+    return {"insight": insight_text, "anomalies": anomalies}
+
+def _generate(contents: str):
+    return genai_client.models.generate_content(
+        model=AI_MODEL,
+        contents=contents,
+        config=prompt_builder.GENERATION_CONFIG
+    )
+
+def _store_answer(db: Session, user_id: int, message: str, cache_key: str, response, estimated_prompt_tokens: int):
+    ai_response = response.text
+    usage = prompt_builder.usage_from_response(response, estimated_prompt_tokens)
+    insight = insight_store.add_insight(db, user_id, f"Q: {message}\nA: {ai_response}", **usage)
+    db.commit()
+    events.publish(user_id, "insight.created", id=insight.id)
+
+    if redis_client:
+        try:
+            with profiling.section("redis"):
+                redis_client.setex(cache_key, 3600, ai_response)
+        except Exception:
+            pass
+
+    return ai_response
 
-    return {"insight": insight_text}
+def _store_late_answer(user_id: int, message: str, cache_key: str, estimated_prompt_tokens: int, future):
+    # The request already got a fallback; keep the model's answer for the next ask
+    if future.cancelled() or future.exception() is not None or not future.result().text:
+        return
+
+    db = SessionLocal()
+    try:
+        _store_answer(db, user_id, message, cache_key, future.result(), estimated_prompt_tokens)
+    except Exception:
+        pass
+    finally:
+        db.close()
+
+def _fallback_answer(recent_trackers: list, stats: dict) -> str:
+    if not recent_trackers:
+        return (
+            "Summary: The AI assistant is unavailable right now, and there is no wellness data logged yet. "
+            "Log your sleep, steps, calories, mood and stress to get personalized advice."
+        )
+
+    latest = recent_trackers[0]
+    sleep_hours = latest.sleep_hours or 7
+    steps = latest.steps or 5000
+    calories = latest.calories or 2000
+    stress_level = latest.stress_level or 5
+
+    score = utils.calculate_wellness_score(sleep_hours, steps, calories, stress_level)
+    recommendations = utils.generate_recommendations(sleep_hours, steps, calories, stress_level, score)
+
+    details = [
+        ANOMALY_MESSAGES[flag["metric"]].format(**flag)
+        for flag in rolling_stats.anomaly_flags(stats)
+    ]
+    if not details:
+        averages = [
+            f"{label} {prompt_builder.format_number(round(stats[metric].mean, 1))}"
+            for metric, label in [("sleep_hours", "sleep"), ("steps", "steps"), ("mood_score", "mood"), ("stress_level", "stress")]
+            if metric in stats and stats[metric].count
+        ]
+        if averages:
+            details.append("Your recent averages are " + ", ".join(averages) + ".")
+
+    answer = (
+        "Summary: The AI assistant is taking longer than usual, so this answer is based on your logged data. "
+        f"Your latest wellness score is {round(score)} out of 100.\n"
+    )
+    if details:
+        answer += "Key Details: " + " ".join(details) + "\n"
+    answer += "Recommendation: " + " ".join(recommendations)
+    return answer
 
 # CHAT WITH AI (Gemini Flash 2.5)
 @router.post("/assistant", response_model=schemas.ChatResponse)
@@ -82,85 +173,87 @@ def chat_with_assistant(
     current_user: models.User = Depends(oauth2.get_current_user),
     db: Session = Depends(get_db)
 ):
-    cache_key = f"ai:chat:{current_user.id}:{hash(chat.message)}"
+    # hash() of a str is salted per process, so workers would never share entries
+    message_digest = hashlib.sha256(chat.message.encode()).hexdigest()
+    cache_key = f"ai:chat:{current_user.id}:{message_digest}"
 
     if redis_client:
-        cached = redis_client.get(cache_key)
+        try:
+            with profiling.section("redis"):
+                cached = redis_client.get(cache_key)
+        except Exception:
+            cached = None
         if cached:
             return {"response": cached, "cached": True}
 
-    latest = (
+    # "Does my sleep affect my mood?" is answered from the user's own numbers
+    if trends.cause_and_effect(chat.message):
+        analysis, _ = trends.user_analysis(db, current_user.id)
+        answer = trends.answer_relationship_question(chat.message, analysis)
+        if answer:
+            insight = insight_store.add_insight(db, current_user.id, f"Q: {chat.message}\nA: {answer}")
+            db.commit()
+            events.publish(current_user.id, "insight.created", id=insight.id)
+            return {"response": answer, "cached": False}
+
+    recent_trackers = (
         db.query(models.Tracker)
         .filter(models.Tracker.user_id == current_user.id)
         .order_by(models.Tracker.date.desc())
-        .first()
+        .limit(prompt_builder.RECENT_DAYS)
+        .all()
     )
+    stats = rolling_stats.load(db, current_user.id)
 
-    context = ""
-    if latest:
-        context = (
-            f"User's recent health data:\n"
-            f"- Sleep: {latest.sleep_hours or 'N/A'} hrs\n"
-            f"- Steps: {latest.steps or 'N/A'}\n"
-            f"- Calories: {latest.calories or 'N/A'}\n"
-            f"- Mood: {latest.mood_score or 'N/A'}/10\n"
-            f"- Stress: {latest.stress_level or 'N/A'}/10\n"
-        )
-
-    try:
-       
-        response = genai_client.models.generate_content(
-        model=AI_MODEL,
-        contents=(
-                    "You are a friendly and professional AI health assistant. "
-                    "Always provide answers in a structured, readable plain text format. "
-                    "Do not include any Markdown symbols like ** or #. "
-                    "Do not write literal text such as 'Bold heading:' or 'Bold subheading:'. "
-                    "Do not use bullet points or code blocks.\n\n"
-
-                    "Structure the response like this:\n"
-                    "1. Summary: One short paragraph (2-3 lines) summarizing the answer.\n"
-                    "2. Key Details:\n"
-                    "   Sleep: 1-3 sentences about sleep.\n"
-                    "   Steps: 1-3 sentences about activity/steps.\n"
-                    "   Mood: 1-3 sentences about mood.\n"
-                    "   Stress: 1-3 sentences about stress.\n"
-                    "   General Explanation: 1-3 sentences about overall health context.\n"
-                    "3. Recommendation: Short, clear actionable advice.\n\n"
-
-                    "Make headings visually distinct by capitalizing or writing on a separate line, "
-                    "subheadings slightly indented or on their own line. Keep the tone supportive, positive, and easy to read.\n\n"
-
-                    "User's recent wellness data:\n"
-                    f"{context}\n\n"
-                    f"User question: {chat.message}"
-                )
-            )
+    context = prompt_builder.build_context(stats, recent_trackers, AI_CONTEXT_TOKEN_BUDGET)
+    contents = prompt_builder.build_contents(chat.message, context)
+    estimated_prompt_tokens = prompt_builder.count_prompt_tokens(contents)
 
-        ai_response = response.text
+    fallback = {"response": _fallback_answer(recent_trackers, stats), "cached": False, "fallback": True}
 
-        new_insight = models.AIInsight(
-            user_id=current_user.id,
-            insight_text=f"Q: {chat.message}\nA: {ai_response}"
-        )
-        db.add(new_insight)
-        db.commit()
+    if not ai_circuit.allow_request():
+        return fallback
 
-        if redis_client:
-            redis_client.setex(cache_key, 3600, ai_response)
+    if not ai_slots.acquire(blocking=False):
+        ai_circuit.release()
+        return fallback
+    try:
+        future = ai_executor.submit(_generate, contents)
+    except RuntimeError:
+        # Executor shut down (worker exiting); not a Gemini failure
+        ai_slots.release()
+        ai_circuit.release()
+        return fallback
+    future.add_done_callback(lambda _: ai_slots.release())
 
-        return {"response": ai_response, "cached": False}
+    try:
+        with profiling.section("gemini"):
+            response = future.result(timeout=AI_LATENCY_BUDGET_SECONDS)
+        if not response.text:
+            raise ValueError("Empty response from AI model")
+    except FutureTimeoutError:
+        ai_circuit.record_failure()
+        if not future.cancel():
+            future.add_done_callback(
+                partial(_store_late_answer, current_user.id, chat.message, cache_key, estimated_prompt_tokens)
+            )
+        return fallback
+    except Exception:
+        ai_circuit.record_failure()
+        return fallback
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error communicating with AI assistant: {str(e)}")
+    ai_circuit.record_success()
+    ai_response = _store_answer(db, current_user.id, chat.message, cache_key, response, estimated_prompt_tokens)
+    return {"response": ai_response, "cached": False}
 
 
 # Get Past AI Insights
-@router.get("/insights", response_model=list[schemas.AIInsightResponse])
+@router.get("/insights", response_model=list[schemas.AIInsightResponse], dependencies=[Depends(conditional_get("insights", "ai_insights"))])
 def get_insights(
+    response: Response,
     limit: int = 10,
-    current_user: models.User = Depends(oauth2.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(oauth2.get_current_read_user),
+    db: Session = Depends(oauth2.get_read_db)
 ):
     insights = (
         db.query(models.AIInsight)
@@ -169,4 +262,4 @@ def get_insights(
         .limit(limit)
         .all()
     )
-    return insights
+    return serialization.fast_response(serialization.rows_to_dicts(insights, schemas.AIInsightResponse), response)
@@ -1,15 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
-from app import models, schemas, oauth2, utils
+from app import models, schemas, oauth2, utils, sketches, trends, cache, serialization, profiling
 from app.database import get_db
+from app.conditional import conditional_get
+from app.cache import get_data_version
 import redis
-import json
 import os
 
-router = APIRouter(prefix="/analytics", tags=["Analytics"])
+router = APIRouter(prefix="/analytics", tags=["Analytics"], route_class=profiling.ProfiledRoute)
 
 redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
 try:
@@ -17,26 +18,22 @@ try:
 except:
     redis_client = None
 
-@router.get("/progress")
-def get_progress(
-    days: int = 30,
-    current_user: models.User = Depends(oauth2.get_current_user),
-    db: Session = Depends(get_db)
-):
-    cache_key = f"analytics:progress:{current_user.id}:{days}"
-    
-    if redis_client:
-        try:
-            cached_data = redis_client.get(cache_key)
-            if cached_data:
-                return {"data": json.loads(cached_data), "cached": True}
-        except:
-            pass
-    
+PROGRESS_CACHE_TTL = 300
+ALL_USERS_CACHE_KEY = "analytics:admin:all_users"
+ALL_USERS_CACHE_TTL = 300
+
+def progress_cache_key(user_id: int, days: int) -> str:
+    # Versioned like the progress ETag (trackers data version plus the UTC day),
+    # so a tracker write can never leave a stale body behind a fresh ETag
+    data_version = get_data_version(user_id, "trackers")
+    version = data_version[0] if data_version else 0
+    return f"analytics:progress:{user_id}:{days}:{version}:{datetime.utcnow().date()}"
+
+def compute_progress(db: Session, user_id: int, days: int) -> dict:
     start_date = datetime.utcnow().date() - timedelta(days=days)
     
     trackers = db.query(models.Tracker).filter(
-        models.Tracker.user_id == current_user.id,
+        models.Tracker.user_id == user_id,
         models.Tracker.date >= start_date
     ).order_by(models.Tracker.date).all()
     
@@ -80,18 +77,44 @@ def get_progress(
             "stress_level": round(stress_sum / count, 2)
         }
     
-    if redis_client:
-        try:
-            redis_client.setex(cache_key, 300, json.dumps(progress_data))
-        except:
-            pass
+    return progress_data
+
+def wellness_summary(tracker) -> dict:
+    sleep_hours = tracker.sleep_hours or 7
+    steps = tracker.steps or 5000
+    calories = tracker.calories or 2000
+    stress_level = tracker.stress_level or 5
+    
+    score = utils.calculate_wellness_score(sleep_hours, steps, calories, stress_level)
+    recommendations = utils.generate_recommendations(sleep_hours, steps, calories, stress_level, score)
     
-    return {"data": progress_data, "cached": False}
+    return {
+        "score": round(score, 2),
+        "recommendations": recommendations
+    }
+
+def _serialized(compute):
+    return lambda: serialization.dumps(compute()).decode("utf-8")
+
+@router.get("/progress", dependencies=[Depends(conditional_get("progress", "trackers"))])
+def get_progress(
+    response: Response,
+    days: int = 30,
+    current_user: models.User = Depends(oauth2.get_current_read_user),
+    db: Session = Depends(oauth2.get_read_db)
+):
+    body, cached = cache.get_or_compute_raw(
+        progress_cache_key(current_user.id, days),
+        PROGRESS_CACHE_TTL,
+        _serialized(lambda: compute_progress(db, current_user.id, days))
+    )
+    
+    return serialization.fast_response(serialization.wrap_cached(body, cached), response)
 
 @router.get("/wellness-score")
 def get_wellness_score(
-    current_user: models.User = Depends(oauth2.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(oauth2.get_current_read_user),
+    db: Session = Depends(oauth2.get_read_db)
 ):
     latest_tracker = db.query(models.Tracker).filter(
         models.Tracker.user_id == current_user.id
@@ -103,41 +126,30 @@ def get_wellness_score(
             detail="No tracker data found. Please log your wellness data first."
         )
     
-    score = utils.calculate_wellness_score(
-        latest_tracker.sleep_hours or 7,
-        latest_tracker.steps or 5000,
-        latest_tracker.calories or 2000,
-        latest_tracker.stress_level or 5
-    )
-    
-    recommendations = utils.generate_recommendations(
-        latest_tracker.sleep_hours or 7,
-        latest_tracker.steps or 5000,
-        latest_tracker.calories or 2000,
-        latest_tracker.stress_level or 5,
-        score
-    )
-    
-    return {
-        "score": round(score, 2),
-        "recommendations": recommendations
-    }
+    return wellness_summary(latest_tracker)
+
+@router.get("/correlations")
+def get_correlations(
+    current_user: models.User = Depends(oauth2.get_current_read_user),
+    db: Session = Depends(oauth2.get_read_db)
+):
+    analysis, cached = trends.user_analysis(db, current_user.id)
+    return {"data": analysis, "cached": cached}
 
 @router.get("/admin/all-users")
 def get_all_users_analytics(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_admin_user)
+    db: Session = Depends(oauth2.get_read_db),
+    current_user: models.User = Depends(oauth2.get_current_read_admin_user)
 ):
-    cache_key = "analytics:admin:all_users"
-    
-    if redis_client:
-        try:
-            cached_data = redis_client.get(cache_key)
-            if cached_data:
-                return {"data": json.loads(cached_data), "cached": True}
-        except:
-            pass
+    body, cached = cache.get_or_compute_raw(
+        ALL_USERS_CACHE_KEY,
+        ALL_USERS_CACHE_TTL,
+        _serialized(lambda: compute_all_users_analytics(db))
+    )
     
+    return serialization.fast_response(serialization.wrap_cached(body, cached))
+
+def compute_all_users_analytics(db: Session) -> list:
     users = db.query(models.User).all()
     analytics_data = []
     
@@ -167,10 +179,55 @@ def get_all_users_analytics(
             "avg_mood": round(avg_data[2], 2) if avg_data[2] else 0
         })
     
-    if redis_client:
-        try:
-            redis_client.setex(cache_key, 300, json.dumps(analytics_data))
-        except:
-            pass
-    
-    return {"data": analytics_data, "cached": False}
+    return analytics_data
+
+@router.get("/admin/cohorts")
+def get_cohort_distribution(
+    metric: str = "wellness_score",
+    group_by: str = "all",
+    days: int = 30,
+    percentiles: str = "50,90",
+    current_user: models.User = Depends(oauth2.get_current_read_admin_user)
+):
+    if metric not in sketches.METRIC_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown metric. Choose one of: {', '.join(sketches.METRIC_BUCKETS)}"
+        )
+
+    if group_by not in ("all", "age_group", "activity_level"):
+        raise HTTPException(
+            status_code=400,
+            detail="group_by must be one of: all, age_group, activity_level"
+        )
+
+    if not 1 <= days <= sketches.SKETCH_RETENTION_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"days must be between 1 and {sketches.SKETCH_RETENTION_DAYS}"
+        )
+
+    try:
+        quantiles = [float(q) for q in percentiles.split(",") if q.strip()]
+    except ValueError:
+        quantiles = []
+    if not quantiles or any(q < 0 or q > 100 for q in quantiles):
+        raise HTTPException(
+            status_code=400,
+            detail="percentiles must be a comma-separated list of numbers between 0 and 100"
+        )
+
+    if not redis_client:
+        raise HTTPException(status_code=503, detail="Cohort analytics require Redis")
+
+    try:
+        cohorts = sketches.cohort_distribution(metric, group_by, days, quantiles)
+    except redis.RedisError:
+        raise HTTPException(status_code=503, detail="Cohort analytics are temporarily unavailable")
+
+    return {
+        "metric": metric,
+        "group_by": group_by,
+        "days": days,
+        "cohorts": cohorts
+    }
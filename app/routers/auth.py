@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from app import models, schemas, utils, oauth2
+from app import models, schemas, utils, oauth2, profiling
 from app.database import get_db
 from pydantic import BaseModel
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=profiling.ProfiledRoute)
 
 @router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
 def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -50,7 +50,7 @@ def login(user_credentials: LoginRequest, db: Session = Depends(get_db)):
         )
 
     access_token = oauth2.create_access_token(
-        data={"user_email": user.email, "role": user.role.value}
+        data={"user_email": user.email, "user_id": user.id, "role": user.role.value}
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
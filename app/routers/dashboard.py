@@ -0,0 +1,130 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from types import SimpleNamespace
+import time
+from app import models, schemas, oauth2, cache, profiling
+from app.database import read_session_for
+from app.routers import analytics
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"], route_class=profiling.ProfiledRoute)
+
+DASHBOARD_PROGRESS_DAYS = 30
+DASHBOARD_INSIGHTS_LIMIT = 10
+
+# Sections run concurrently; goals reuse the request's authentication session
+# and the others get their own, so a request holds at most three connections
+dashboard_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="dashboard")
+
+
+def _timed(section):
+    def run(*args):
+        started = time.perf_counter()
+        try:
+            return section(*args), None, (time.perf_counter() - started) * 1000
+        except Exception as e:
+            return None, str(e), (time.perf_counter() - started) * 1000
+    return run
+
+
+def _progress_and_wellness(user_id: int, cache_key: str, cached_entry):
+    # The newest logged day is already in the progress window, so the
+    # wellness score rarely needs a query of its own.
+    timings = {}
+    db = read_session_for(user_id)
+    try:
+        started = time.perf_counter()
+        progress_data, cached = cache.get_or_compute(
+            cache_key,
+            analytics.PROGRESS_CACHE_TTL,
+            lambda: analytics.compute_progress(db, user_id, DASHBOARD_PROGRESS_DAYS),
+            prefetched=cached_entry
+        )
+        progress = {"data": progress_data, "cached": cached}
+        timings["progress"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        daily_data = progress["data"]["daily_data"]
+        if daily_data:
+            latest = SimpleNamespace(**daily_data[-1])
+        else:
+            latest = db.query(models.Tracker).filter(
+                models.Tracker.user_id == user_id
+            ).order_by(models.Tracker.date.desc()).first()
+        wellness = analytics.wellness_summary(latest) if latest else None
+        timings["wellness_score"] = (time.perf_counter() - started) * 1000
+    finally:
+        db.close()
+
+    return {"progress": progress, "wellness_score": wellness, "timings": timings}
+
+
+def _goals(db: Session, user_id: int):
+    goals = db.query(models.Goal).filter(models.Goal.user_id == user_id).all()
+    return [schemas.GoalResponse.model_validate(goal).model_dump(mode="json") for goal in goals]
+
+
+def _insights(user_id: int):
+    db = read_session_for(user_id)
+    try:
+        insights = (
+            db.query(models.AIInsight)
+            .filter(models.AIInsight.user_id == user_id)
+            .order_by(models.AIInsight.generated_at.desc())
+            .limit(DASHBOARD_INSIGHTS_LIMIT)
+            .all()
+        )
+        return [schemas.AIInsightResponse.model_validate(insight).model_dump(mode="json") for insight in insights]
+    finally:
+        db.close()
+
+
+@router.get("/")
+def get_dashboard(
+    current_user: models.User = Depends(oauth2.get_current_read_user),
+    db: Session = Depends(oauth2.get_read_db)
+):
+    started = time.perf_counter()
+    timings = {}
+    errors = {}
+
+    # Cache keys are versioned, so: one version lookup, then every key in one MGET
+    cache_started = time.perf_counter()
+    cache_keys = [analytics.progress_cache_key(current_user.id, DASHBOARD_PROGRESS_DAYS)]
+    cached_values = [None] * len(cache_keys)
+    if cache.redis_client:
+        try:
+            with profiling.section("redis"):
+                cached_values = cache.redis_client.mget(cache_keys)
+        except Exception:
+            pass
+    timings["cache"] = (time.perf_counter() - cache_started) * 1000
+
+    # Sections keep the request's context (e.g. an active profile)
+    futures = {
+        "progress": dashboard_executor.submit(copy_context().run, _timed(_progress_and_wellness), current_user.id, cache_keys[0], cached_values[0]),
+        "insights": dashboard_executor.submit(copy_context().run, _timed(_insights), current_user.id),
+    }
+    results = {}
+    results["goals"], error, timings["goals"] = _timed(_goals)(db, current_user.id)
+    if error:
+        errors["goals"] = error
+    for section, future in futures.items():
+        results[section], error, timings[section] = future.result()
+        if error:
+            errors[section] = error
+
+    progress_section = results["progress"] or {}
+    timings.update(progress_section.get("timings", {}))
+    timings["total"] = (time.perf_counter() - started) * 1000
+
+    return {
+        "user": schemas.UserResponse.model_validate(current_user).model_dump(mode="json"),
+        "progress": progress_section.get("progress"),
+        "wellness_score": progress_section.get("wellness_score"),
+        "goals": results["goals"],
+        "insights": results["insights"],
+        "errors": errors,
+        "timings_ms": {section: round(value, 2) for section, value in timings.items()},
+    }
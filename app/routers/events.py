@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from app import oauth2, profiling
+from app.events import event_broker
+import asyncio
+
+router = APIRouter(prefix="/events", tags=["Events"], route_class=profiling.ProfiledRoute)
+
+EVENT_HEARTBEAT_SECONDS = 15
+EVENT_RETRY_MILLISECONDS = 5000
+
+
+def _stream_user_id(request: Request, token: str = None):
+    # EventSource cannot set headers, so the token may come as a query parameter
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+
+    user_id = oauth2.token_user_id(token) if token else None
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+
+async def _event_stream(request: Request, user_id: int):
+    # An idle client costs one queue and one suspended coroutine; no database
+    # session or Redis connection is held for it.
+    queue = event_broker.subscribe(user_id)
+    try:
+        yield f"retry: {EVENT_RETRY_MILLISECONDS}\n\n"
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), EVENT_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield f"data: {payload}\n\n"
+    finally:
+        event_broker.unsubscribe(user_id, queue)
+
+
+@router.get("/stream")
+async def stream_events(request: Request, token: str = None):
+    user_id = _stream_user_id(request, token)
+    return StreamingResponse(
+        _event_stream(request, user_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
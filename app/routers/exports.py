@@ -0,0 +1,155 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime
+from app import models, oauth2, profiling
+from app.database import read_session_for
+import csv
+import io
+import json
+import zlib
+
+router = APIRouter(prefix="/export", tags=["Export"], route_class=profiling.ProfiledRoute)
+
+# Rows fetched per server-side cursor round trip and per emitted chunk
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_RESOURCES = {
+    "trackers": (
+        models.Tracker,
+        ["id", "date", "steps", "calories", "sleep_hours", "mood_score", "stress_level", "created_at"],
+    ),
+    "goals": (
+        models.Goal,
+        ["id", "goal_type", "target_value", "current_value", "deadline", "created_at"],
+    ),
+    "insights": (
+        models.AIInsight,
+        ["id", "insight_text", "generated_at"],
+    ),
+}
+
+# Insight text lives in the deduplicated content table
+EXPORT_COLUMN_OVERRIDES = {
+    ("insights", "insight_text"): models.AIInsightContent.text,
+}
+EXPORT_JOINS = {
+    "insights": [models.AIInsight.content],
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _format_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _iter_rows(user_id: int, resource: str, after_id: int):
+    # The export outlives the request-scoped session, so it owns its own.
+    model, fields = EXPORT_RESOURCES[resource]
+    columns = [
+        EXPORT_COLUMN_OVERRIDES[(resource, field)]
+        if (resource, field) in EXPORT_COLUMN_OVERRIDES else getattr(model, field)
+        for field in fields
+    ]
+
+    db = read_session_for(user_id)
+    try:
+        rows = db.query(*columns).select_from(model)
+        for relationship in EXPORT_JOINS.get(resource, []):
+            rows = rows.join(relationship)
+        rows = (
+            rows
+            .filter(model.user_id == user_id, model.id > after_id)
+            .order_by(model.id)
+            .yield_per(EXPORT_BATCH_SIZE)
+        )
+        for row in rows:
+            yield [_format_value(value) for value in row]
+    finally:
+        db.close()
+
+
+def _csv_chunks(fields, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(fields, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(fields, row))))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # wbits=31 writes a gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(user_id: int, resource: str, format: str, gzip: bool = False, after_id: int = 0):
+    _, fields = EXPORT_RESOURCES[resource]
+    rows = _iter_rows(user_id, resource, after_id)
+    chunks = _csv_chunks(fields, rows) if format == "csv" else _ndjson_chunks(fields, rows)
+    return _gzip_chunks(chunks) if gzip else chunks
+
+
+@router.get("/{resource}")
+def export_resource(
+    resource: str,
+    format: str = "csv",
+    gzip: bool = False,
+    after_id: int = 0,
+    current_user: models.User = Depends(oauth2.get_current_read_user)
+):
+    if resource not in EXPORT_RESOURCES:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown export resource. Choose one of: {', '.join(EXPORT_RESOURCES)}"
+        )
+
+    if format not in MEDIA_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail="Unsupported export format. Use 'csv' or 'ndjson'."
+        )
+
+    chunks = export_chunks(current_user.id, resource, format, gzip, after_id)
+
+    filename = f"{resource}.{format}"
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, status, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app import models, schemas, oauth2
+from app import models, schemas, oauth2, goal_engine, events, profiling
+from app.conditional import conditional_get
 from app.database import get_db
 
-router = APIRouter(prefix="/goals", tags=["Goals"])
+router = APIRouter(prefix="/goals", tags=["Goals"], route_class=profiling.ProfiledRoute)
 
 @router.post("/", response_model=schemas.GoalResponse, status_code=status.HTTP_201_CREATED)
 def create_goal(
@@ -18,15 +19,18 @@ def create_goal(
     )
     
     db.add(new_goal)
+    db.flush()
+    goal_engine.recompute_goal(db, new_goal)
     db.commit()
     db.refresh(new_goal)
+    events.publish(current_user.id, "goal.created", id=new_goal.id)
     
     return new_goal
 
-@router.get("/", response_model=List[schemas.GoalResponse])
+@router.get("/", response_model=List[schemas.GoalResponse], dependencies=[Depends(conditional_get("goals", "goals"))])
 def get_goals(
-    current_user: models.User = Depends(oauth2.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(oauth2.get_current_read_user),
+    db: Session = Depends(oauth2.get_read_db)
 ):
     goals = db.query(models.Goal).filter(
         models.Goal.user_id == current_user.id
@@ -37,8 +41,8 @@ def get_goals(
 @router.get("/{goal_id}", response_model=schemas.GoalResponse)
 def get_goal(
     goal_id: int,
-    current_user: models.User = Depends(oauth2.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(oauth2.get_current_read_user),
+    db: Session = Depends(oauth2.get_read_db)
 ):
     goal = db.query(models.Goal).filter(
         models.Goal.id == goal_id,
@@ -75,8 +79,12 @@ def update_goal(
     for key, value in update_data.items():
         setattr(goal, key, value)
     
+    if "deadline" in update_data and "current_value" not in update_data:
+        goal_engine.recompute_goal(db, goal)
+    
     db.commit()
     db.refresh(goal)
+    events.publish(current_user.id, "goal.updated", id=goal.id)
     
     return goal
 
@@ -99,5 +107,6 @@ def delete_goal(
     
     db.delete(goal)
     db.commit()
+    events.publish(current_user.id, "goal.deleted", id=goal_id)
     
     return None
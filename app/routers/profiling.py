@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app import models, oauth2, profiling
+from app.config import PROFILE_MAX_CAPTURES
+import time
+
+router = APIRouter(prefix="/admin/profiling", tags=["Profiling"], route_class=profiling.ProfiledRoute)
+
+PROFILE_MAX_MINUTES = 60
+
+
+@router.post("/token")
+def create_profile_token(
+    minutes: int = Query(10, ge=1, le=PROFILE_MAX_MINUTES),
+    current_user: models.User = Depends(oauth2.get_current_admin_user)
+):
+    # Sent as the X-Profile header, it captures any request it is attached to
+    expires_at = int(time.time()) + minutes * 60
+    return {
+        "header": "X-Profile",
+        "value": profiling.sign_profile_token(oauth2.SECRET_KEY, expires_at),
+        "expires_at": expires_at
+    }
+
+
+@router.put("/users/{user_id}")
+def enable_user_profiling(
+    user_id: int,
+    minutes: int = Query(10, ge=1, le=PROFILE_MAX_MINUTES),
+    current_user: models.User = Depends(oauth2.get_current_admin_user)
+):
+    expires_at = profiling.enable_for_user(user_id, minutes)
+    return {"user_id": user_id, "expires_at": expires_at}
+
+
+@router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+def disable_user_profiling(
+    user_id: int,
+    current_user: models.User = Depends(oauth2.get_current_admin_user)
+):
+    profiling.disable_for_user(user_id)
+    return None
+
+
+@router.get("/captures")
+def list_profile_captures(
+    limit: int = Query(20, ge=1, le=PROFILE_MAX_CAPTURES),
+    current_user: models.User = Depends(oauth2.get_current_admin_user)
+):
+    return [
+        {key: value for key, value in capture.items() if key != "samples"}
+        for capture in profiling.list_captures(limit)
+    ]
+
+
+@router.get("/captures/{capture_id}")
+def get_profile_capture(
+    capture_id: str,
+    current_user: models.User = Depends(oauth2.get_current_admin_user)
+):
+    capture = profiling.get_capture(capture_id)
+    if not capture:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile capture not found"
+        )
+    return capture
@@ -1,11 +1,224 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Response, UploadFile, File
+from sqlalchemy import func, select, text
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from pydantic import ValidationError
 from typing import List
 from datetime import date
-from app import models, schemas, oauth2
-from app.database import get_db
+from app import models, schemas, oauth2, goal_engine, profiling, rolling_stats, sketches, events, serialization
+from app.conditional import conditional_get
+from app.cache import redis_client
+from app.database import get_db, mark_user_write, SessionLocal
+import csv
+import io
+import json
+
+router = APIRouter(prefix="/trackers", tags=["Trackers"], route_class=profiling.ProfiledRoute)
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 100
+IMPORT_PROGRESS_TTL = 3600
+TRACKER_FIELDS = ["date", "steps", "calories", "sleep_hours", "mood_score", "stress_level"]
+MERGE_FIELDS = TRACKER_FIELDS[1:]
+
+
+def _tracker_values(tracker: models.Tracker) -> dict:
+    return {field: getattr(tracker, field) for field in TRACKER_FIELDS}
+
+
+def _lock_tracker_days(db: Session, user_id: int, days):
+    # Every write of a tracker day takes this transaction-level lock before
+    # reading the row, so concurrent writers of the same day queue instead of
+    # computing goal and rolling-stat deltas from a stale row. The days of one
+    # call are locked in ascending order, so batches of overlapping days (an
+    # import against a PUT that moves a row) can't deadlock each other.
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(:user_id, day) FROM unnest(CAST(:days AS integer[])) AS day"),
+        {"user_id": user_id, "days": sorted({day.toordinal() for day in days})}
+    )
+
+
+def _get_locked_tracker(db: Session, user_id: int, tracker_id: int, *days):
+    # Locks the row's day (and `days`, e.g. the one a PUT moves it to) and
+    # re-reads it under the lock. A concurrent PUT may have moved the row to
+    # another day in the meantime; that day is then locked as well. Returns
+    # None if the row doesn't exist (or was deleted concurrently).
+    query = db.query(models.Tracker).populate_existing().filter(
+        models.Tracker.id == tracker_id,
+        models.Tracker.user_id == user_id
+    )
+    tracker = query.first()
+    locked = set()
+    while tracker is not None and not {tracker.date, *days} <= locked:
+        pending = {tracker.date, *days} - locked
+        _lock_tracker_days(db, user_id, pending)
+        locked |= pending
+        tracker = query.first()
+    return tracker
+
+
+def _import_progress_key(user_id: int) -> str:
+    return f"trackers:import:{user_id}"
+
+
+def _report_import_progress(user_id: int, progress: dict):
+    if redis_client:
+        try:
+            with profiling.section("redis"):
+                redis_client.setex(_import_progress_key(user_id), IMPORT_PROGRESS_TTL, json.dumps(progress))
+        except Exception:
+            pass
+
+
+def _upsert_tracker_batch(db: Session, user_id: int, batch: dict):
+    # Returns (old, new) value pairs for the rows the batch inserted or replaced
+    _lock_tracker_days(db, user_id, batch)
+    existing = {
+        row.date: dict(row._mapping)
+        for row in db.query(*[getattr(models.Tracker, field) for field in TRACKER_FIELDS]).filter(
+            models.Tracker.user_id == user_id,
+            models.Tracker.date.in_(list(batch))
+        )
+    }
+
+    stmt = pg_insert(models.Tracker).values([
+        {"user_id": user_id, **values} for values in batch.values()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "date"],
+        set_={field: stmt.excluded[field] for field in TRACKER_FIELDS if field != "date"}
+    )
+    db.execute(stmt)
+    mark_user_write(db, user_id, "trackers")
+    db.commit()
+
+    return [(existing.get(day), values) for day, values in batch.items()]
+
+
+def _merge_statement(user_id: int, day: date, fields: dict):
+    # Upserts, COALESCE-merges the given fields into the stored row, and returns
+    # it together with the row as it was before the statement (a RETURNING
+    # subquery reads the statement's snapshot, not its own write).
+    table = models.Tracker.__table__
+    previous = table.alias("previous")
+
+    stmt = pg_insert(table).values(
+        user_id=user_id, date=day, **{field: fields.get(field) for field in MERGE_FIELDS}
+    )
+    previous_row = (
+        select(func.json_build_object(*[arg for field in MERGE_FIELDS for arg in (field, previous.c[field])]))
+        .where(previous.c.user_id == user_id, previous.c.date == day)
+        .scalar_subquery()
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "date"],
+        set_={field: func.coalesce(stmt.excluded[field], table.c[field]) for field in MERGE_FIELDS}
+    ).returning(*table.c, previous_row.label("previous"))
+
+
+def merge_tracker(user_id: int, day: date, fields: dict):
+    # Returns (row, old, new). Round trips: the (user, day) advisory lock, the
+    # merge statement, the goal and rolling-stat updates (two to four queries),
+    # and the commit. Concurrent merges of the same day queue on the lock, so
+    # each one's statement snapshot already includes the previous merge and
+    # "previous" is never stale; nothing needs to be retried.
+    db = SessionLocal()
+    try:
+        _lock_tracker_days(db, user_id, [day])
+        row = db.execute(_merge_statement(user_id, day, fields)).one()
+
+        old = {"date": day, **row.previous} if row.previous is not None else None
+        new = {field: getattr(row, field) for field in TRACKER_FIELDS}
+        goal_engine.apply_tracker_change(db, user_id, old, new)
+        rolling_stats.apply_tracker_change(db, user_id, old, new)
+        mark_user_write(db, user_id, "trackers")
+        db.commit()
+        return row, old, new
+    finally:
+        db.close()
+
+
+@router.post("/import")
+def import_trackers(
+    file: UploadFile = File(...),
+    current_user: models.User = Depends(oauth2.get_current_user),
+    db: Session = Depends(get_db)
+):
+    progress = {"status": "running", "processed": 0, "imported": 0, "failed": 0}
+    errors = []
+    # Keyed by date so a repeated day inside one batch collapses to its last line
+    batch = {}
+
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+    if not reader.fieldnames or "date" not in reader.fieldnames:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV must have a header row with a 'date' column"
+        )
+
+    for row in reader:
+        progress["processed"] += 1
+        values = {
+            field: (row.get(field) or "").strip() or None
+            for field in TRACKER_FIELDS
+        }
+        try:
+            tracker = schemas.TrackerCreate(**values)
+        except ValidationError as e:
+            progress["failed"] += 1
+            if len(errors) < IMPORT_MAX_REPORTED_ERRORS:
+                errors.append({
+                    "line": reader.line_num,
+                    "errors": [
+                        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+                        for err in e.errors()
+                    ]
+                })
+            continue
+
+        batch[tracker.date] = tracker.model_dump()
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            changes = _upsert_tracker_batch(db, current_user.id, batch)
+            sketches.record_tracker_changes(current_user, changes)
+            progress["imported"] += len(batch)
+            batch = {}
+            _report_import_progress(current_user.id, progress)
+
+    if batch:
+        changes = _upsert_tracker_batch(db, current_user.id, batch)
+        sketches.record_tracker_changes(current_user, changes)
+        progress["imported"] += len(batch)
+
+    # Past months without a partition stay in the default partition until the
+    # ensure-partitions command (or the next startup) creates them; creating
+    # one here would lock the whole trackers table inside the request
+    # Imported history is mostly backdated, so rebuild derived state once
+    goal_engine.recompute_goals(db, user_id=current_user.id)
+    rolling_stats.rebuild(db, user_id=current_user.id)
+
+    progress["status"] = "completed"
+    _report_import_progress(current_user.id, progress)
+    events.publish(current_user.id, "trackers.imported", count=progress["imported"])
+
+    return {**progress, "errors": errors}
+
+
+@router.get("/import/progress")
+def get_import_progress(current_user: models.User = Depends(oauth2.get_current_user)):
+    if redis_client:
+        try:
+            with profiling.section("redis"):
+                cached = redis_client.get(_import_progress_key(current_user.id))
+            if cached:
+                return json.loads(cached)
+        except Exception:
+            pass
+
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="No import in progress"
+    )
 
-router = APIRouter(prefix="/trackers", tags=["Trackers"])
 
 @router.post("/", response_model=schemas.TrackerResponse, status_code=status.HTTP_201_CREATED)
 def create_tracker(
@@ -13,6 +226,7 @@ def create_tracker(
     current_user: models.User = Depends(oauth2.get_current_user),
     db: Session = Depends(get_db)
 ):
+    _lock_tracker_days(db, current_user.id, [tracker.date])
     existing_tracker = db.query(models.Tracker).filter(
         models.Tracker.user_id == current_user.id,
         models.Tracker.date == tracker.date
@@ -29,30 +243,52 @@ def create_tracker(
         **tracker.model_dump()
     )
     
+    new_values = _tracker_values(new_tracker)
     db.add(new_tracker)
+    goal_engine.apply_tracker_change(db, current_user.id, None, new_values)
+    rolling_stats.apply_tracker_change(db, current_user.id, None, new_values)
     db.commit()
     db.refresh(new_tracker)
+    sketches.record_tracker_change(current_user, None, new_values)
+    events.publish(current_user.id, "tracker.created", id=new_tracker.id, date=new_tracker.date)
     
     return new_tracker
 
-@router.get("/", response_model=List[schemas.TrackerResponse])
+@router.put("/by-date/{day}", response_model=schemas.TrackerResponse)
+def merge_tracker_by_date(
+    day: date,
+    fields: schemas.TrackerMerge,
+    response: Response,
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    row, old, new = merge_tracker(current_user.id, day, fields.model_dump())
+    
+    sketches.record_tracker_change(current_user, old, new)
+    events.publish(current_user.id, "tracker.updated" if old else "tracker.created", id=row.id, date=day)
+    
+    if old is None:
+        response.status_code = status.HTTP_201_CREATED
+    return {column: getattr(row, column) for column in schemas.TrackerResponse.model_fields}
+
+@router.get("/", response_model=List[schemas.TrackerResponse], dependencies=[Depends(conditional_get("trackers", "trackers"))])
 def get_trackers(
+    response: Response,
     skip: int = 0,
     limit: int = 30,
-    current_user: models.User = Depends(oauth2.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(oauth2.get_current_read_user),
+    db: Session = Depends(oauth2.get_read_db)
 ):
     trackers = db.query(models.Tracker).filter(
         models.Tracker.user_id == current_user.id
     ).order_by(models.Tracker.date.desc()).offset(skip).limit(limit).all()
     
-    return trackers
+    return serialization.fast_response(serialization.rows_to_dicts(trackers, schemas.TrackerResponse), response)
 
 @router.get("/{tracker_id}", response_model=schemas.TrackerResponse)
 def get_tracker(
     tracker_id: int,
-    current_user: models.User = Depends(oauth2.get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(oauth2.get_current_read_user),
+    db: Session = Depends(oauth2.get_read_db)
 ):
     tracker = db.query(models.Tracker).filter(
         models.Tracker.id == tracker_id,
@@ -74,10 +310,7 @@ def update_tracker(
     current_user: models.User = Depends(oauth2.get_current_user),
     db: Session = Depends(get_db)
 ):
-    tracker = db.query(models.Tracker).filter(
-        models.Tracker.id == tracker_id,
-        models.Tracker.user_id == current_user.id
-    ).first()
+    tracker = _get_locked_tracker(db, current_user.id, tracker_id, tracker_update.date)
     
     if not tracker:
         raise HTTPException(
@@ -85,11 +318,17 @@ def update_tracker(
             detail="Tracker not found"
         )
     
+    old_values = _tracker_values(tracker)
     for key, value in tracker_update.model_dump().items():
         setattr(tracker, key, value)
     
+    new_values = _tracker_values(tracker)
+    goal_engine.apply_tracker_change(db, current_user.id, old_values, new_values)
+    rolling_stats.apply_tracker_change(db, current_user.id, old_values, new_values)
     db.commit()
     db.refresh(tracker)
+    sketches.record_tracker_change(current_user, old_values, new_values)
+    events.publish(current_user.id, "tracker.updated", id=tracker.id, date=tracker.date)
     
     return tracker
 
@@ -99,10 +338,7 @@ def delete_tracker(
     current_user: models.User = Depends(oauth2.get_current_user),
     db: Session = Depends(get_db)
 ):
-    tracker = db.query(models.Tracker).filter(
-        models.Tracker.id == tracker_id,
-        models.Tracker.user_id == current_user.id
-    ).first()
+    tracker = _get_locked_tracker(db, current_user.id, tracker_id)
     
     if not tracker:
         raise HTTPException(
@@ -110,7 +346,12 @@ def delete_tracker(
             detail="Tracker not found"
         )
     
+    old_values = _tracker_values(tracker)
+    goal_engine.apply_tracker_change(db, current_user.id, old_values, None)
+    rolling_stats.apply_tracker_change(db, current_user.id, old_values, None)
     db.delete(tracker)
     db.commit()
+    sketches.record_tracker_change(current_user, old_values, None)
+    events.publish(current_user.id, "tracker.deleted", id=tracker_id, date=old_values["date"])
     
     return None
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
-from app import models, schemas, oauth2
+from datetime import date
+from app import models, schemas, oauth2, sketches, user_directory, profiling
 from app.database import get_db
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=profiling.ProfiledRoute)
 
 @router.get("/me", response_model=schemas.UserResponse)
 def get_current_user_info(current_user: models.User = Depends(oauth2.get_current_user)):
@@ -16,6 +17,7 @@ def update_current_user(
     current_user: models.User = Depends(oauth2.get_current_user),
     db: Session = Depends(get_db)
 ):
+    old_cohorts = sketches.user_cohorts(current_user)
     if user_update.name is not None:
         current_user.name = user_update.name
     if user_update.age is not None:
@@ -31,22 +33,54 @@ def update_current_user(
     
     db.commit()
     db.refresh(current_user)
+    sketches.move_user_cohorts(db, current_user, old_cohorts)
     
     return current_user
 
 @router.get("/", response_model=List[schemas.UserResponse])
 def get_all_users(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_admin_user)
+    request: Request,
+    response: Response,
+    limit: int = Query(user_directory.DIRECTORY_PAGE_SIZE, ge=1, le=user_directory.DIRECTORY_MAX_PAGE_SIZE),
+    cursor: str = None,
+    role: models.UserRole = None,
+    activity_level: str = None,
+    signed_up_from: date = None,
+    signed_up_to: date = None,
+    q: str = Query(None, max_length=100),
+    db: Session = Depends(oauth2.get_read_db),
+    current_user: models.User = Depends(oauth2.get_current_read_admin_user)
 ):
-    users = db.query(models.User).all()
+    try:
+        users, next_cursor = user_directory.directory_page(
+            db,
+            limit,
+            cursor,
+            role=role,
+            activity_level=activity_level,
+            signed_up_from=signed_up_from,
+            signed_up_to=signed_up_to,
+            q=q
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    # The body stays a plain list; the next page is linked from the headers
+    if next_cursor:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    
     return users
 
 @router.get("/{user_id}", response_model=schemas.UserResponse)
 def get_user_by_id(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_admin_user)
+    db: Session = Depends(oauth2.get_read_db),
+    current_user: models.User = Depends(oauth2.get_current_read_admin_user)
 ):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
@@ -62,6 +62,14 @@ class TrackerBase(BaseModel):
 class TrackerCreate(TrackerBase):
     pass
 
+class TrackerMerge(BaseModel):
+    # Fields left out (or null) keep their stored value
+    steps: Optional[int] = None
+    calories: Optional[int] = None
+    sleep_hours: Optional[float] = None
+    mood_score: Optional[int] = Field(None, ge=1, le=10)
+    stress_level: Optional[int] = Field(None, ge=1, le=10)
+
 class TrackerResponse(TrackerBase):
     id: int
     user_id: int
@@ -97,6 +105,8 @@ class AIInsightResponse(BaseModel):
     user_id: int
     insight_text: str
     generated_at: datetime
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -107,6 +117,7 @@ class ChatMessage(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     cached: bool = False
+    fallback: bool = False
 
 class WellnessScore(BaseModel):
     score: float
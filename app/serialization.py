@@ -0,0 +1,61 @@
+from fastapi import Response
+from datetime import date, datetime
+from decimal import Decimal
+from app import profiling
+import enum
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fast response path for large read endpoints: ORM rows the database already
+# constrained are turned into plain dicts without another round of Pydantic
+# validation, then encoded once with orjson (stdlib json when it is missing).
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value) -> bytes:
+    with profiling.section("serialization"):
+        if orjson is not None:
+            return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8")
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def rows_to_dicts(rows, schema) -> list:
+    fields = list(schema.model_fields)
+    return [{field: getattr(row, field) for field in fields} for row in rows]
+
+def wrap_cached(body, cached: bool) -> bytes:
+    # {"data": <already-serialized body>, "cached": ...} without decoding the body
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return b'{"data":' + body + (b',"cached":true}' if cached else b',"cached":false}')
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+def fast_response(content, response: Response = None, status_code: int = 200) -> FastJSONResponse:
+    # Returning a Response skips FastAPI's encoder, which would also drop headers
+    # dependencies set on the injected response (ETag, Last-Modified); carry them over.
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
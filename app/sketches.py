@@ -0,0 +1,262 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+from app import models, profiling, utils
+from app.cache import redis_client
+import uuid
+
+# Fixed-bucket histograms per metric, day and cohort. Buckets are identical
+# everywhere, so merging cohorts or days is just adding counts.
+# metric -> (lower bound, bucket width, bucket count)
+METRIC_BUCKETS = {
+    "sleep_hours": (0.0, 0.25, 64),
+    "steps": (0.0, 250.0, 200),
+    "calories": (0.0, 50.0, 120),
+    "mood_score": (0.5, 1.0, 10),
+    "stress_level": (0.5, 1.0, 10),
+    "wellness_score": (0.0, 1.0, 101),
+}
+
+AGE_GROUPS = [
+    (0, 17, "under_18"),
+    (18, 29, "18-29"),
+    (30, 39, "30-39"),
+    (40, 49, "40-49"),
+    (50, 59, "50-59"),
+    (60, 200, "60+"),
+]
+
+SKETCH_RETENTION_DAYS = 400
+SKETCH_PREFIX = "sketch"
+TRACKER_VALUE_FIELDS = ["date", "steps", "calories", "sleep_hours", "mood_score", "stress_level"]
+
+
+def age_group(age: Optional[int]) -> str:
+    if age is None:
+        return "unknown"
+    for low, high, label in AGE_GROUPS:
+        if low <= age <= high:
+            return label
+    return "unknown"
+
+
+def user_cohorts(user) -> dict:
+    return {
+        "all": "all",
+        "age_group": age_group(user.age),
+        "activity_level": (user.activity_level or "unknown").strip().lower() or "unknown",
+    }
+
+
+def _bucket(metric: str, value: float) -> int:
+    low, width, count = METRIC_BUCKETS[metric]
+    return min(max(int((value - low) // width), 0), count - 1)
+
+
+def _sketch_key(metric: str, dimension: str, cohort: str, day: date, prefix: str = SKETCH_PREFIX) -> str:
+    return f"{prefix}:{metric}:{dimension}:{cohort}:{day.strftime('%Y%m%d')}"
+
+
+def _cohorts_key(dimension: str, prefix: str = SKETCH_PREFIX) -> str:
+    return f"{prefix}:cohorts:{dimension}"
+
+
+def _retention_start() -> date:
+    return datetime.utcnow().date() - timedelta(days=SKETCH_RETENTION_DAYS)
+
+
+def _metric_values(values: dict) -> dict:
+    metrics = {
+        metric: values.get(metric)
+        for metric in METRIC_BUCKETS
+        if metric != "wellness_score" and values.get(metric) is not None
+    }
+    metrics["wellness_score"] = utils.calculate_wellness_score(
+        values.get("sleep_hours") or 7,
+        values.get("steps") or 5000,
+        values.get("calories") or 2000,
+        values.get("stress_level") or 5
+    )
+    return metrics
+
+
+def _add_to_pipeline(pipe, cohorts: dict, values: dict, increment: int, prefix: str = SKETCH_PREFIX):
+    day = values["date"]
+    # Backdated entries older than the retention window are never queried
+    if day < _retention_start():
+        return
+    for metric, value in _metric_values(values).items():
+        bucket = _bucket(metric, value)
+        for dimension, cohort in cohorts.items():
+            key = _sketch_key(metric, dimension, cohort, day, prefix)
+            pipe.hincrby(key, bucket, increment)
+            pipe.expire(key, SKETCH_RETENTION_DAYS * 86400)
+
+
+def record_tracker_change(user, old: Optional[dict], new: Optional[dict]):
+    record_tracker_changes(user, [(old, new)])
+
+
+def record_tracker_changes(user, changes, prefix: str = SKETCH_PREFIX):
+    # changes: iterable of (old values, new values) pairs, either side may be None
+    if not redis_client:
+        return
+
+    cohorts = user_cohorts(user)
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for dimension, cohort in cohorts.items():
+            pipe.sadd(_cohorts_key(dimension, prefix), cohort)
+        for old, new in changes:
+            if old is not None:
+                _add_to_pipeline(pipe, cohorts, old, -1, prefix)
+            if new is not None:
+                _add_to_pipeline(pipe, cohorts, new, 1, prefix)
+        with profiling.section("redis"):
+            pipe.execute()
+    except Exception:
+        pass
+
+
+def move_user_cohorts(db, user, old_cohorts: dict):
+    # A profile edit moves the user between cohorts: their retained samples are
+    # taken out of the cohorts they were counted under and added to the new
+    # ones, so later edits and deletes decrement the cohort that holds them.
+    if not redis_client:
+        return
+
+    new_cohorts = user_cohorts(user)
+    changed = [dimension for dimension in new_cohorts if new_cohorts[dimension] != old_cohorts.get(dimension)]
+    if not changed:
+        return
+
+    rows = (
+        db.query(*[getattr(models.Tracker, field) for field in TRACKER_VALUE_FIELDS])
+        .filter(models.Tracker.user_id == user.id, models.Tracker.date >= _retention_start())
+        .all()
+    )
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for dimension in changed:
+            pipe.sadd(_cohorts_key(dimension), new_cohorts[dimension])
+        for row in rows:
+            values = dict(zip(TRACKER_VALUE_FIELDS, row))
+            for dimension in changed:
+                _add_to_pipeline(pipe, {dimension: old_cohorts[dimension]}, values, -1)
+                _add_to_pipeline(pipe, {dimension: new_cohorts[dimension]}, values, 1)
+        with profiling.section("redis"):
+            pipe.execute()
+    except Exception:
+        pass
+
+
+def _percentile(counts: list, total: int, metric: str, q: float) -> float:
+    low, width, _ = METRIC_BUCKETS[metric]
+    rank = q / 100 * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count <= 0:
+            continue
+        if seen + count >= rank:
+            # Interpolate linearly inside the bucket
+            return low + (index + (rank - seen) / count) * width
+        seen += count
+    return low + len(counts) * width
+
+
+def cohort_distribution(metric: str, dimension: str, days: int, percentiles: list):
+    low, width, bucket_count = METRIC_BUCKETS[metric]
+
+    with profiling.section("redis"):
+        cohorts = sorted(redis_client.smembers(_cohorts_key(dimension)))
+    today = datetime.utcnow().date()
+    day_range = [today - timedelta(days=offset) for offset in range(days)]
+
+    pipe = redis_client.pipeline(transaction=False)
+    for cohort in cohorts:
+        for day in day_range:
+            pipe.hgetall(_sketch_key(metric, dimension, cohort, day))
+    with profiling.section("redis"):
+        histograms = pipe.execute()
+
+    results = []
+    for position, cohort in enumerate(cohorts):
+        counts = [0] * bucket_count
+        for histogram in histograms[position * days:(position + 1) * days]:
+            for bucket, count in histogram.items():
+                counts[int(bucket)] += int(count)
+
+        total = sum(count for count in counts if count > 0)
+        if total == 0:
+            continue
+
+        mean = sum(
+            (low + (index + 0.5) * width) * count
+            for index, count in enumerate(counts) if count > 0
+        ) / total
+
+        results.append({
+            "cohort": cohort,
+            "count": total,
+            "mean": round(mean, 2),
+            "percentiles": {
+                f"p{q:g}": round(_percentile(counts, total, metric, q), 2)
+                for q in percentiles
+            }
+        })
+
+    return results
+
+
+def _swap_in_rebuilt_keys(build_prefix: str):
+    # Each live key is replaced by a single RENAME (or deleted when the rebuild
+    # has no data for it), so readers never see a half-built histogram
+    live_keys = set(redis_client.scan_iter(match=f"{SKETCH_PREFIX}:*", count=1000))
+    built_keys = list(redis_client.scan_iter(match=f"{build_prefix}:*", count=1000))
+
+    renamed = set()
+    for start in range(0, len(built_keys), 1000):
+        pipe = redis_client.pipeline(transaction=True)
+        for key in built_keys[start:start + 1000]:
+            target = SKETCH_PREFIX + key[len(build_prefix):]
+            pipe.rename(key, target)
+            renamed.add(target)
+        pipe.execute()
+
+    stale_keys = list(live_keys - renamed)
+    for start in range(0, len(stale_keys), 1000):
+        redis_client.delete(*stale_keys[start:start + 1000])
+
+
+def rebuild(db, batch_size: int = 5000) -> int:
+    # Builds into temporary keys while live writes keep landing on the current
+    # ones, then swaps them in
+    build_prefix = f"{SKETCH_PREFIX}-rebuild:{uuid.uuid4().hex}"
+    fields = TRACKER_VALUE_FIELDS
+    rows = (
+        db.query(models.User, *[getattr(models.Tracker, field) for field in fields])
+        .join(models.Tracker, models.Tracker.user_id == models.User.id)
+        .filter(models.Tracker.date >= _retention_start())
+        .order_by(models.User.id)
+        .yield_per(batch_size)
+    )
+
+    recorded = 0
+    pending_user = None
+    pending = []
+    for row in rows:
+        user = row[0]
+        if pending_user is not None and user.id != pending_user.id:
+            record_tracker_changes(pending_user, pending, build_prefix)
+            pending = []
+        pending_user = user
+        pending.append((None, dict(zip(fields, row[1:]))))
+        recorded += 1
+        if len(pending) >= batch_size:
+            record_tracker_changes(pending_user, pending, build_prefix)
+            pending = []
+
+    if pending:
+        record_tracker_changes(pending_user, pending, build_prefix)
+
+    _swap_in_rebuilt_keys(build_prefix)
+    return recorded
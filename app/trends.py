@@ -0,0 +1,239 @@
+from sqlalchemy.orm import Session
+import json
+import re
+import numpy as np
+from app import models, profiling
+from app.cache import redis_client, get_data_version
+
+TREND_METRICS = ["sleep_hours", "steps", "calories", "mood_score", "stress_level"]
+CORRELATION_LAGS = [0, 1]
+MIN_PAIRED_DAYS = 7
+ANALYSIS_CACHE_TTL = 86400
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+METRIC_LABELS = {
+    "sleep_hours": "sleep",
+    "steps": "steps",
+    "calories": "calorie intake",
+    "mood_score": "mood",
+    "stress_level": "stress",
+}
+
+# Words in a chat message that refer to a tracked metric
+METRIC_KEYWORDS = {
+    "sleep_hours": ["sleep", "slept", "rest"],
+    "steps": ["steps", "walk", "walking", "activity", "exercise"],
+    "calories": ["calorie", "calories", "eat", "eating", "food", "diet"],
+    "mood_score": ["mood", "happy", "happiness", "feel"],
+    "stress_level": ["stress", "stressed", "anxiety", "anxious"],
+}
+# A relationship question names two metrics with one of these between them
+# ("does my sleep affect my mood"), or opens with "correlation between ..."
+RELATION_PATTERN = re.compile(
+    r"\b(?:affect(?:s|ed|ing)?|impact(?:s|ed|ing)?|influenc(?:e|es|ed|ing)|correlat\w*"
+    r"|relate[sd]?|linked|connected|depend(?:s|ed|ing|ent)?|cause[sd]?)\b"
+)
+BETWEEN_PATTERN = re.compile(r"\b(?:correlations?|relationships?|links?|connections?) between\b")
+# Between the two metrics, these put the cause second: "is my mood affected by sleep"
+REVERSED_RELATION_PATTERN = re.compile(
+    r"\b(?:affected|impacted|influenced|caused|driven|determined|explained) by\b"
+    r"|\bbecause of\b|\bdue to\b|\bresult of\b|\bdepends? on\b|\bdependent on\b"
+)
+
+
+def _daily_matrix(rows):
+    # One row per calendar day from the first to the last entry, NaN where nothing was logged
+    start = rows[0][0]
+    offsets = np.fromiter(((row[0] - start).days for row in rows), dtype=np.int64, count=len(rows))
+    values = np.array(
+        [[np.nan if value is None else value for value in row[1:]] for row in rows],
+        dtype=float
+    )
+    matrix = np.full((int(offsets[-1]) + 1, len(TREND_METRICS)), np.nan)
+    matrix[offsets] = values
+    return start, matrix
+
+
+def _pearson(x, y):
+    mask = ~(np.isnan(x) | np.isnan(y))
+    n = int(mask.sum())
+    if n < MIN_PAIRED_DAYS:
+        return None, n
+
+    xs = x[mask] - x[mask].mean()
+    ys = y[mask] - y[mask].mean()
+    denominator = np.sqrt((xs * xs).sum() * (ys * ys).sum())
+    if denominator == 0:
+        return None, n
+    return float((xs * ys).sum() / denominator), n
+
+
+def _correlations(matrix):
+    results = []
+    for lag in CORRELATION_LAGS:
+        for i, x_metric in enumerate(TREND_METRICS):
+            for j, y_metric in enumerate(TREND_METRICS):
+                if i == j and lag == 0:
+                    continue
+                x = matrix[:len(matrix) - lag, i]
+                y = matrix[lag:, j]
+                r, n = _pearson(x, y)
+                if r is None:
+                    continue
+                results.append({"x": x_metric, "y": y_metric, "lag_days": lag, "r": round(r, 3), "n": n})
+
+    results.sort(key=lambda item: abs(item["r"]), reverse=True)
+    return results
+
+
+def _trends(matrix):
+    days = np.arange(len(matrix), dtype=float)
+    trends = {}
+    for i, metric in enumerate(TREND_METRICS):
+        y = matrix[:, i]
+        mask = ~np.isnan(y)
+        n = int(mask.sum())
+        if n < 2:
+            continue
+        t = days[mask] - days[mask].mean()
+        denominator = (t * t).sum()
+        if denominator == 0:
+            continue
+        slope = float((t * (y[mask] - y[mask].mean())).sum() / denominator)
+        trends[metric] = {"slope_per_week": round(slope * 7, 4), "n": n}
+    return trends
+
+
+def _weekday_means(start, matrix):
+    weekdays = (start.weekday() + np.arange(len(matrix))) % 7
+    seasonality = {}
+    for i, metric in enumerate(TREND_METRICS):
+        y = matrix[:, i]
+        mask = ~np.isnan(y)
+        if not mask.any():
+            continue
+        sums = np.bincount(weekdays[mask], weights=y[mask], minlength=7)
+        counts = np.bincount(weekdays[mask], minlength=7)
+        seasonality[metric] = {
+            WEEKDAYS[day]: round(float(sums[day] / counts[day]), 2) if counts[day] else None
+            for day in range(7)
+        }
+    return seasonality
+
+
+def analyze(rows) -> dict:
+    # rows: (date, *TREND_METRICS) tuples ordered by date
+    if not rows:
+        return {"days_covered": 0, "entries": 0, "correlations": [], "trends": {}, "weekday_means": {}}
+
+    start, matrix = _daily_matrix(rows)
+    return {
+        "days_covered": len(matrix),
+        "entries": len(rows),
+        "correlations": _correlations(matrix),
+        "trends": _trends(matrix),
+        "weekday_means": _weekday_means(start, matrix),
+    }
+
+
+def user_analysis(db: Session, user_id: int):
+    # Returns (analysis, cached); cached per user data version
+    cache_key = None
+    data_version = get_data_version(user_id, "trackers")
+    if data_version is not None:
+        cache_key = f"analytics:correlations:{user_id}:{data_version[0]}"
+        try:
+            with profiling.section("redis"):
+                cached = redis_client.get(cache_key)
+            if cached:
+                return json.loads(cached), True
+        except Exception:
+            cache_key = None
+
+    columns = [models.Tracker.date] + [getattr(models.Tracker, metric) for metric in TREND_METRICS]
+    rows = db.query(*columns).filter(
+        models.Tracker.user_id == user_id
+    ).order_by(models.Tracker.date).all()
+
+    analysis = analyze(rows)
+
+    if cache_key:
+        try:
+            with profiling.section("redis"):
+                redis_client.setex(cache_key, ANALYSIS_CACHE_TTL, json.dumps(analysis))
+        except Exception:
+            pass
+
+    return analysis, False
+
+
+def _strength(r: float) -> str:
+    magnitude = abs(r)
+    if magnitude < 0.1:
+        return "no meaningful"
+    if magnitude < 0.3:
+        return "a weak"
+    if magnitude < 0.5:
+        return "a moderate"
+    return "a strong"
+
+
+def mentioned_metrics(message: str) -> list:
+    # Metrics in order of first mention, as (metric, character offset)
+    found = []
+    for match in re.finditer(r"[a-z]+", message.lower()):
+        for metric, keywords in METRIC_KEYWORDS.items():
+            if match.group() in keywords and metric not in (seen for seen, _ in found):
+                found.append((metric, match.start()))
+    return found
+
+
+def cause_and_effect(message: str):
+    # Returns (cause, effect) for a relationship question about exactly two
+    # metrics, else None
+    found = mentioned_metrics(message)
+    if len(found) != 2:
+        return None
+    (first, first_at), (second, second_at) = found
+    text = message.lower()
+    between = text[first_at:second_at]
+    if REVERSED_RELATION_PATTERN.search(between):
+        return second, first
+    if RELATION_PATTERN.search(between) or BETWEEN_PATTERN.search(text[:first_at]):
+        return first, second
+    return None
+
+
+def answer_relationship_question(message: str, analysis: dict):
+    # Answers "does X affect Y?" from precomputed correlations, or returns None
+    metrics = cause_and_effect(message)
+    if metrics is None:
+        return None
+    cause, effect = metrics
+
+    candidates = [
+        item for item in analysis["correlations"]
+        if item["x"] == cause and item["y"] == effect
+    ]
+    if not candidates:
+        return (
+            f"There isn't enough overlapping data yet to relate your {METRIC_LABELS[cause]} "
+            f"and {METRIC_LABELS[effect]}. Keep logging both for at least {MIN_PAIRED_DAYS} days."
+        )
+
+    best = max(candidates, key=lambda item: abs(item["r"]))
+    direction = "higher" if best["r"] > 0 else "lower"
+    timing = "the following day" if best["lag_days"] else "on the same day"
+
+    answer = (
+        f"Summary: Across {best['n']} days of your data there is {_strength(best['r'])} "
+        f"relationship between your {METRIC_LABELS[cause]} and your {METRIC_LABELS[effect]} "
+        f"{timing} (correlation {best['r']:+.2f})."
+    )
+    if abs(best["r"]) >= 0.1:
+        answer += (
+            f" When your {METRIC_LABELS[cause]} is higher, your {METRIC_LABELS[effect]} tends to be "
+            f"{direction} {timing}."
+        )
+    answer += " This shows an association in your own history, not proof of cause and effect."
+    return answer
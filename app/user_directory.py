@@ -0,0 +1,70 @@
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from datetime import date, datetime, time, timedelta
+import base64
+from app import models
+
+DIRECTORY_PAGE_SIZE = 50
+DIRECTORY_MAX_PAGE_SIZE = 200
+
+# Trigrams need three characters; shorter searches match as prefixes instead
+TRIGRAM_MIN_LENGTH = 3
+
+
+def encode_cursor(user_id: int) -> str:
+    return base64.urlsafe_b64encode(str(user_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    # Raises ValueError on anything we did not issue
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return int(base64.urlsafe_b64decode(padded.encode()).decode())
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_filter(q: str):
+    # Length of what the user typed: escaping "_" or "%" would double-count it
+    term = q.strip().lower()
+    escaped = _like_escape(term)
+    pattern = f"{escaped}%" if len(term) < TRIGRAM_MIN_LENGTH else f"%{escaped}%"
+    return or_(
+        func.lower(models.User.name).like(pattern, escape="\\"),
+        func.lower(models.User.email).like(pattern, escape="\\"),
+    )
+
+
+def directory_query(
+    db: Session,
+    after_id: int = 0,
+    role: models.UserRole = None,
+    activity_level: str = None,
+    signed_up_from: date = None,
+    signed_up_to: date = None,
+    q: str = None,
+):
+    query = db.query(models.User).filter(models.User.id > after_id)
+
+    if role is not None:
+        query = query.filter(models.User.role == role)
+    if activity_level is not None:
+        query = query.filter(models.User.activity_level == activity_level)
+    if signed_up_from is not None:
+        query = query.filter(models.User.created_at >= datetime.combine(signed_up_from, time.min))
+    if signed_up_to is not None:
+        query = query.filter(models.User.created_at < datetime.combine(signed_up_to + timedelta(days=1), time.min))
+    if q and q.strip():
+        query = query.filter(search_filter(q))
+
+    return query.order_by(models.User.id)
+
+
+def directory_page(db: Session, limit: int, cursor: str = None, **filters):
+    # Returns (users, next_cursor); next_cursor is None on the last page
+    after_id = decode_cursor(cursor) if cursor else 0
+    users = directory_query(db, after_id=after_id, **filters).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(users[limit - 1].id) if len(users) > limit else None
+    return users[:limit], next_cursor
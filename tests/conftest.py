@@ -0,0 +1,61 @@
+# These tests run against the database and Redis configured for the app
+# (DATABASE_URL, REDIS_URL, e.g. from .env). Everything they commit is written
+# for a throwaway user that is dropped again afterwards.
+import uuid
+import pytest
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.config import DATABASE_URL
+
+if not DATABASE_URL:
+    collect_ignore_glob = ["test_*.py"]
+
+BENCHMARK_USER_TABLES = ["trackers", "goals", "ai_insights", "user_metric_stats"]
+
+
+def create_benchmark_user() -> int:
+    from sqlalchemy import text
+    from app.database import engine
+
+    with engine.begin() as conn:
+        return conn.execute(
+            text(
+                "INSERT INTO users (name, email, password_hash, role, created_at) "
+                "VALUES ('Benchmark', :email, '!', 'USER', now()) RETURNING id"
+            ),
+            {"email": f"benchmark-{uuid.uuid4().hex}@example.invalid"}
+        ).scalar()
+
+
+def drop_benchmark_user(user_id: int):
+    from sqlalchemy import text
+    from app.database import engine
+
+    with engine.begin() as conn:
+        for table in BENCHMARK_USER_TABLES:
+            conn.execute(text(f"DELETE FROM {table} WHERE user_id = :user_id"), {"user_id": user_id})
+        conn.execute(text("DELETE FROM users WHERE id = :user_id"), {"user_id": user_id})
+
+
+@pytest.fixture
+def benchmark_user():
+    user_id = create_benchmark_user()
+    try:
+        yield user_id
+    finally:
+        drop_benchmark_user(user_id)
+
+
+@pytest.fixture
+def redis_client():
+    from app import cache
+
+    if cache.redis_client is None:
+        pytest.skip("Redis is not configured")
+    try:
+        cache.redis_client.ping()
+    except Exception:
+        pytest.skip("Redis is not reachable")
+    return cache.redis_client
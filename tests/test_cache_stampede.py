@@ -0,0 +1,33 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from app import cache
+
+CONCURRENT_READERS = 50
+COMPUTE_SECONDS = 0.2
+
+
+def test_concurrent_cold_misses_compute_once(redis_client):
+    key = f"cache-test:{uuid.uuid4().hex}"
+    computes = []
+    start = threading.Barrier(CONCURRENT_READERS)
+
+    def compute():
+        computes.append(1)
+        time.sleep(COMPUTE_SECONDS)
+        return json.dumps({"computed": True})
+
+    def read(_):
+        start.wait()
+        return cache.get_or_compute_raw(key, 60, compute)[0]
+
+    try:
+        with ThreadPoolExecutor(max_workers=CONCURRENT_READERS) as pool:
+            bodies = list(pool.map(read, range(CONCURRENT_READERS)))
+    finally:
+        redis_client.delete(key)
+
+    assert len(computes) == 1
+    assert set(bodies) == {json.dumps({"computed": True})}
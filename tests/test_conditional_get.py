@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime
+import httpx
+from sqlalchemy import event, text
+from app import oauth2
+from app.database import engine, read_engine
+from app.main import app
+
+
+async def _revalidate_then_write(user_id: int, email: str, statements: list) -> dict:
+    token = oauth2.create_access_token(data={"user_email": email, "user_id": user_id, "role": "user"})
+    headers = {"Authorization": f"Bearer {token}"}
+    today = datetime.utcnow().date().isoformat()
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        first = await client.get("/analytics/progress", headers=headers)
+        etag = first.headers.get("etag")
+
+        bounds = {engine, read_engine}
+        for bound in bounds:
+            event.listen(bound, "before_cursor_execute", count_statement)
+        try:
+            revalidated = await client.get("/analytics/progress", headers={**headers, "If-None-Match": etag or ""})
+        finally:
+            for bound in bounds:
+                event.remove(bound, "before_cursor_execute", count_statement)
+
+        written = await client.post("/trackers/", headers=headers, json={"date": today, "steps": 4321})
+        after_write = await client.get("/analytics/progress", headers={**headers, "If-None-Match": etag or ""})
+
+    return {"today": today, "first": first, "etag": etag, "revalidated": revalidated, "written": written, "after_write": after_write}
+
+
+def test_revalidation_skips_the_database_and_writes_change_the_body(benchmark_user, redis_client):
+    with engine.connect() as conn:
+        email = conn.execute(text("SELECT email FROM users WHERE id = :id"), {"id": benchmark_user}).scalar()
+
+    statements = []
+    result = asyncio.run(_revalidate_then_write(benchmark_user, email, statements))
+
+    assert result["first"].status_code == 200
+    assert result["etag"]
+    assert result["revalidated"].status_code == 304
+    assert statements == []
+
+    assert result["written"].status_code == 201
+    after_write = result["after_write"]
+    assert after_write.status_code == 200
+    assert after_write.headers.get("etag") != result["etag"]
+    assert any(
+        day["date"] == result["today"] and day["steps"] == 4321
+        for day in after_write.json()["data"]["daily_data"]
+    )
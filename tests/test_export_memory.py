@@ -0,0 +1,42 @@
+import os
+import tracemalloc
+from datetime import date
+import pytest
+from sqlalchemy import text
+from app.database import SessionLocal, mark_user_write
+from app.routers import exports
+
+# A full-size run (the default) seeds two million rows; set EXPORT_TEST_ROWS lower for a quick pass
+EXPORT_ROWS = int(os.getenv("EXPORT_TEST_ROWS", "2000000"))
+EXPORT_MAX_MEMORY_MB = float(os.getenv("EXPORT_TEST_MAX_MEMORY_MB", "50"))
+
+# One row per day from 0001-01-01, so every seeded date converts to a Python date
+SEED_TRACKERS_SQL = """
+    INSERT INTO trackers (user_id, date, steps, calories, sleep_hours, mood_score, stress_level, created_at)
+    SELECT :user_id, DATE '0001-01-01' + g, 8000 + g % 4000, 2100, 7.5, 1 + g % 10, 1 + g % 10, now()
+    FROM generate_series(0, :rows - 1) AS g
+"""
+MAX_SEED_ROWS = (date.max - date.min).days + 1
+
+
+@pytest.mark.parametrize("format,gzip", [("csv", False), ("ndjson", True)])
+def test_export_stays_under_the_memory_ceiling(benchmark_user, format, gzip):
+    assert EXPORT_ROWS <= MAX_SEED_ROWS, f"EXPORT_TEST_ROWS is capped at {MAX_SEED_ROWS}"
+
+    db = SessionLocal()
+    try:
+        db.execute(text(SEED_TRACKERS_SQL), {"user_id": benchmark_user, "rows": EXPORT_ROWS})
+        mark_user_write(db, benchmark_user, "trackers")
+        db.commit()
+    finally:
+        db.close()
+
+    tracemalloc.start()
+    try:
+        exported = sum(len(chunk) for chunk in exports.export_chunks(benchmark_user, "trackers", format, gzip))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert exported > 0
+    assert peak / (1024 * 1024) <= EXPORT_MAX_MEMORY_MB
@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from app import models, schemas, sketches
+from app.database import SessionLocal, engine
+from app.routers import trackers
+
+CONCURRENT_WRITERS = 20
+DAYS = 40
+
+
+def test_concurrent_writes_of_one_user_keep_every_goal_increment(benchmark_user):
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO goals (user_id, goal_type, target_value, current_value, sample_count, created_at) "
+                "VALUES (:user_id, 'total_steps', 1000000, 0, 0, :created_at)"
+            ),
+            {"user_id": benchmark_user, "created_at": datetime(2000, 1, 1)}
+        )
+
+    days = [date.today() - timedelta(days=offset) for offset in range(DAYS)]
+    with ThreadPoolExecutor(max_workers=CONCURRENT_WRITERS) as pool:
+        list(pool.map(lambda day: trackers.merge_tracker(benchmark_user, day, {"steps": 100}), days))
+
+    with engine.connect() as conn:
+        current_value, sample_count = conn.execute(
+            text("SELECT current_value, sample_count FROM goals WHERE user_id = :user_id"),
+            {"user_id": benchmark_user}
+        ).one()
+    assert (current_value, sample_count) == (100.0 * DAYS, DAYS)
+
+
+def test_concurrent_puts_and_merges_of_one_day_keep_the_goal_in_step(benchmark_user, monkeypatch):
+    # PUT /trackers/{id} and PUT /trackers/by-date/{date} rewrite the same day
+    # at once; each must apply its goal delta against the row it replaced.
+    monkeypatch.setattr(sketches, "record_tracker_change", lambda *args: None)
+    day = date.today()
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO goals (user_id, goal_type, target_value, current_value, sample_count, created_at) "
+                "VALUES (:user_id, 'total_steps', 1000000, 0, 0, :created_at)"
+            ),
+            {"user_id": benchmark_user, "created_at": datetime(2000, 1, 1)}
+        )
+    row, _, _ = trackers.merge_tracker(benchmark_user, day, {"steps": 1})
+
+    def put(worker: int):
+        steps = 100 + worker
+        if worker % 2:
+            trackers.merge_tracker(benchmark_user, day, {"steps": steps})
+            return
+        db = SessionLocal()
+        try:
+            user = db.get(models.User, benchmark_user)
+            trackers.update_tracker(row.id, schemas.TrackerCreate(date=day, steps=steps), current_user=user, db=db)
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_WRITERS) as pool:
+        list(pool.map(put, range(CONCURRENT_WRITERS * 2)))
+
+    with engine.connect() as conn:
+        steps = conn.execute(
+            text("SELECT steps FROM trackers WHERE user_id = :user_id AND date = :day"),
+            {"user_id": benchmark_user, "day": day}
+        ).scalar()
+        current_value, sample_count = conn.execute(
+            text("SELECT current_value, sample_count FROM goals WHERE user_id = :user_id"),
+            {"user_id": benchmark_user}
+        ).one()
+    assert (current_value, sample_count) == (float(steps), 1)
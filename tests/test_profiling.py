@@ -0,0 +1,41 @@
+import asyncio
+import time
+from datetime import datetime
+import httpx
+from sqlalchemy import text
+from app import oauth2, profiling
+from app.database import engine
+from app.main import app
+
+GOALS = 500
+
+
+async def _profiled_get(path: str, user_id: int, email: str) -> httpx.Response:
+    token = oauth2.create_access_token(data={"user_email": email, "user_id": user_id, "role": "user"})
+    headers = {
+        "Authorization": f"Bearer {token}",
+        profiling.PROFILE_HEADER: profiling.sign_profile_token(oauth2.SECRET_KEY, int(time.time()) + 60),
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        return await client.get(path, headers=headers)
+
+
+def test_response_model_encoding_is_timed_as_serialization(benchmark_user):
+    with engine.begin() as conn:
+        email = conn.execute(text("SELECT email FROM users WHERE id = :id"), {"id": benchmark_user}).scalar()
+        conn.execute(
+            text(
+                "INSERT INTO goals (user_id, goal_type, target_value, current_value, sample_count, created_at) "
+                "SELECT :user_id, 'total_steps', 10000, g, 1, :created_at FROM generate_series(1, :goals) AS g"
+            ),
+            {"user_id": benchmark_user, "created_at": datetime(2000, 1, 1), "goals": GOALS}
+        )
+
+    response = asyncio.run(_profiled_get("/goals/", benchmark_user, email))
+
+    assert response.status_code == 200
+    assert len(response.json()) == GOALS
+    capture = profiling.get_capture(response.headers["X-Profile-Id"])
+    assert capture["calls"]["serialization"] == 1
+    assert capture["breakdown_ms"]["serialization"] > 0
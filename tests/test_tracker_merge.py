@@ -0,0 +1,92 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from app import goal_engine, models, rolling_stats
+from app.database import SessionLocal
+from app.routers import trackers
+
+VALUES = {"steps": 8000, "calories": 2100, "sleep_hours": 7.5, "mood_score": 6, "stress_level": 4}
+CONCURRENT_WRITERS = 10
+LATENCY_REQUESTS = 200
+
+
+def _save_tracker_legacy(user_id: int, day: date, values: dict):
+    # The SELECT-then-INSERT/UPDATE and refresh sequence of POST /trackers and PUT /trackers/{id}
+    db = SessionLocal()
+    try:
+        tracker = db.query(models.Tracker).filter(
+            models.Tracker.user_id == user_id, models.Tracker.date == day
+        ).first()
+        old = None
+        if tracker is None:
+            tracker = models.Tracker(user_id=user_id, date=day, **values)
+            db.add(tracker)
+        else:
+            old = {field: getattr(tracker, field) for field in trackers.TRACKER_FIELDS}
+            for key, value in values.items():
+                setattr(tracker, key, value)
+        new = {field: getattr(tracker, field) for field in trackers.TRACKER_FIELDS}
+        goal_engine.apply_tracker_change(db, user_id, old, new)
+        rolling_stats.apply_tracker_change(db, user_id, old, new)
+        db.commit()
+        db.refresh(tracker)
+    finally:
+        db.close()
+
+
+def _latency_summary(timings: list) -> str:
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return f"median {statistics.median(timings):7.2f} ms  p95 {p95:7.2f} ms"
+
+
+def test_concurrent_merges_of_one_day_make_one_row(benchmark_user):
+    # Every writer sets one different field of the same day at once; all of
+    # them must end up merged into a single row, and exactly one of them must
+    # have seen the day as new.
+    day = date.today()
+
+    def merge(worker: int):
+        field = trackers.MERGE_FIELDS[worker % len(trackers.MERGE_FIELDS)]
+        _, old, _ = trackers.merge_tracker(benchmark_user, day, {field: VALUES[field]})
+        return old is None
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_WRITERS) as pool:
+        created = list(pool.map(merge, range(CONCURRENT_WRITERS)))
+
+    db = SessionLocal()
+    try:
+        rows = db.query(models.Tracker).filter(
+            models.Tracker.user_id == benchmark_user, models.Tracker.date == day
+        ).all()
+    finally:
+        db.close()
+
+    assert len(rows) == 1
+    assert sum(created) == 1
+    written = {trackers.MERGE_FIELDS[worker % len(trackers.MERGE_FIELDS)] for worker in range(CONCURRENT_WRITERS)}
+    assert all(getattr(rows[0], field) == VALUES[field] for field in written)
+
+
+def test_merge_latency_against_the_legacy_path(benchmark_user):
+    # Reports save latency (run with -s to see it); asserts only that every save landed
+    legacy_days = [date.today() - timedelta(days=1 + i) for i in range(LATENCY_REQUESTS)]
+    merge_days = [date.today() - timedelta(days=1 + LATENCY_REQUESTS + i) for i in range(LATENCY_REQUESTS)]
+
+    def timed(fn, *args):
+        started = time.perf_counter()
+        fn(*args)
+        return (time.perf_counter() - started) * 1000
+
+    for phase in ("insert", "update"):
+        legacy = [timed(_save_tracker_legacy, benchmark_user, day, VALUES) for day in legacy_days]
+        merged = [timed(trackers.merge_tracker, benchmark_user, day, VALUES) for day in merge_days]
+        print(f"{phase:<7} legacy {_latency_summary(legacy)} | merge {_latency_summary(merged)}")
+
+    db = SessionLocal()
+    try:
+        count = db.query(models.Tracker).filter(models.Tracker.user_id == benchmark_user).count()
+    finally:
+        db.close()
+    assert count == 2 * LATENCY_REQUESTS
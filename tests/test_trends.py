@@ -0,0 +1,17 @@
+import pytest
+from app import trends
+
+
+@pytest.mark.parametrize("message,expected", [
+    ("Does my sleep affect my mood?", ("sleep_hours", "mood_score")),
+    ("Is my mood affected by sleep?", ("sleep_hours", "mood_score")),
+    ("is my stress due to walking", ("steps", "stress_level")),
+    ("How does sleep relate to mood?", ("sleep_hours", "mood_score")),
+    ("Is there a correlation between sleep and stress?", ("sleep_hours", "stress_level")),
+    ("How can I connect my watch to track steps and sleep better?", None),
+    ("I'm stressed about my relationship and can't sleep", None),
+    ("I feel disconnected and stressed", None),
+    ("tips for sleep and mood", None),
+])
+def test_cause_and_effect(message, expected):
+    assert trends.cause_and_effect(message) == expected